@@ -3,20 +3,129 @@ Optimized EmailAgent with improved performance, error handling, and functionalit
 """
 
 import re
+import array
+import hashlib
 import logging
+import threading
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Iterable, Iterator, Optional, Any, Sequence, Set, Tuple
 from dataclasses import dataclass, field
-from collections import defaultdict
+from collections import Counter, defaultdict
+
+try:
+    import ahocorasick
+except ImportError:
+    # pyahocorasick is optional; reason() falls back to the compiled regexes
+    ahocorasick = None
+
+try:
+    import xxhash
+except ImportError:
+    # xxhash is optional; email fingerprints fall back to hashlib.blake2b
+    xxhash = None
+
+try:
+    import hyperscan
+except ImportError:
+    # hyperscan is optional; used ahead of pyahocorasick when available
+    hyperscan = None
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional; task filters fall back to a pure-Python column scan
+    np = None
+
+try:
+    from numba import njit
+    from numba.typed import List as NumbaList
+except ImportError:
+    # numba is optional; used when no C matcher library is installed
+    njit = None
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Keyword-match flags returned by EmailAgent._match_keywords()
+_MEETING = 1
+_DEADLINE = 2
+_PRIORITY = 4
+# Once these are set, further matches cannot change the classification
+_RESOLVED = _MEETING | _PRIORITY
+
+
+def _is_word_char(char: str) -> bool:
+    """Return True if char counts as a word character for ``\\b`` semantics."""
+    return char.isalnum() or char == "_"
+
+
+def _fingerprint(subject: Any, body: Any) -> int:
+    """
+    Return a 64-bit content fingerprint for an email.
+
+    Unlike hash(), the result is stable across processes, so it can be
+    persisted and compared between runs.
+    """
+    data = f"{subject}\x00{body}".encode("utf-8", "surrogatepass")
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _jit_contains_word(text, words):
+        """Return True if any of words occurs in text on \\b boundaries."""
+        n = len(text)
+        for word in words:
+            start = text.find(word)
+            while start != -1:
+                end = start + len(word)
+                if ((start == 0 or not (text[start - 1].isalnum() or text[start - 1] == "_"))
+                        and (end == n or not (text[end].isalnum() or text[end] == "_"))):
+                    return True
+                start = text.find(word, start + 1)
+        return False
+
+    @njit(cache=True)
+    def _jit_match_keywords(text, meeting_words, deadline_words, priority_words):
+        """Compiled equivalent of EmailAgent._match_regex()."""
+        hits = _PRIORITY if _jit_contains_word(text, priority_words) else 0
+        if _jit_contains_word(text, meeting_words):
+            hits |= _MEETING
+        elif _jit_contains_word(text, deadline_words):
+            hits |= _DEADLINE
+        return hits
+
+
+def _on_hyperscan_match(pattern_id, start, end, flags, hits) -> bool:
+    """Hyperscan match handler; returning True stops the scan."""
+    hits[0] |= pattern_id
+    return hits[0] & _RESOLVED == _RESOLVED
+
 
-@dataclass
+# Maps every ASCII non-word character to a space, so str.split() yields \w+ runs
+_NON_WORD_TABLE = str.maketrans({c: " " for c in map(chr, range(128)) if not _is_word_char(c)})
+
+
+def _keyword_regex(words) -> str:
+    """Regex matching any of words as a whole word."""
+    return r'\b(?:' + '|'.join(map(re.escape, words)) + r')\b'
+
+
+def _minimal_literals(words) -> tuple:
+    """Drop every word that contains another word, keeping a covering set."""
+    unique = dict.fromkeys(words)
+    return tuple(w for w in unique if not any(o != w and o in w for o in unique))
+
+
+@dataclass(slots=True, eq=False)
 class Task:
-    """Represents a task created from an email."""
+    """
+    Represents a task created from an email.
+
+    Tasks compare and hash on (description, task_type) only, which is what
+    EmailAgent deduplicates on.
+    """
     description: str
     task_type: str
     created_at: datetime = field(default_factory=datetime.now)
@@ -37,20 +146,255 @@ class Task:
 class EmailAgent:
     """Optimized email agent that processes emails and creates tasks."""
     
-    # Class constants for patterns and keywords
-    MEETING_KEYWORDS = r'\b(meeting|meetings|schedule|appointment|call|conference)\b'
-    DEADLINE_KEYWORDS = r'\b(deadline|deadlines|due|submit|deliver|urgent)\b'
-    HIGH_PRIORITY_KEYWORDS = r'\b(urgent|asap|immediately|critical|important)\b'
-    
+    # Keyword lists. Subclasses may override them, and every matcher
+    # (including the derived MEETING_KEYWORDS, DEADLINE_KEYWORDS and
+    # HIGH_PRIORITY_KEYWORDS regexes) is rebuilt. A subclass may instead
+    # override the regexes themselves; it is then matched with those
+    # regexes only, since the faster matchers need literal keywords.
+    MEETING_WORDS = ("meeting", "meetings", "schedule", "appointment", "call", "conference")
+    DEADLINE_WORDS = ("deadline", "deadlines", "due", "submit", "deliver", "urgent")
+    HIGH_PRIORITY_WORDS = ("urgent", "asap", "immediately", "critical", "important")
+
+    # Task description for each email type
+    _TASK_DESCRIPTIONS = {
+        "meeting": "Follow up on meeting request.",
+        "deadline": "Check upcoming deadline.",
+        "misc": "Review misc email."
+    }
+
+    # Small-int codes for the task columns; unseen values get the next free code
+    _TYPE_CODES = {"meeting": 0, "deadline": 1, "misc": 2}
+    _PRIORITY_CODES = {"normal": 0, "high": 1}
+
+    # Overriding any of these in a subclass recompiles its keyword matchers
+    _KEYWORD_ATTRS = ("MEETING_WORDS", "DEADLINE_WORDS", "HIGH_PRIORITY_WORDS")
+    # Derived from the word lists by _compile_matchers() unless overridden
+    _DERIVED_ATTRS = ("MEETING_KEYWORDS", "DEADLINE_KEYWORDS", "HIGH_PRIORITY_KEYWORDS")
+    # The _DERIVED_ATTRS a subclass has replaced with its own regexes
+    _regex_overrides: frozenset = frozenset()
+
+    __slots__ = ("_tasks", "processed_emails", "_task_keys", "_type_codes",
+                 "_priority_codes", "_type_column", "_priority_column", "_summary")
+
+    def __init_subclass__(cls, **kwargs):
+        """Recompile the keyword matchers for subclasses that override keywords."""
+        super().__init_subclass__(**kwargs)
+        overrides = set(cls._regex_overrides)
+        changed = False
+        for words_name, regex_name in zip(cls._KEYWORD_ATTRS, cls._DERIVED_ATTRS):
+            # Whichever of the pair the class defines itself wins
+            if regex_name in cls.__dict__:
+                overrides.add(regex_name)
+                changed = True
+            elif words_name in cls.__dict__:
+                overrides.discard(regex_name)
+                changed = True
+        if changed:
+            cls._regex_overrides = frozenset(overrides)
+            cls._compile_matchers()
+
+    @classmethod
+    def _compile_matchers(cls) -> None:
+        """
+        Compile the keyword matchers once per class, shared by all instances.
+
+        Every backend is built from the *_WORDS lists, so they all agree.
+        A class that overrides any *_KEYWORDS regex gets the regexes only.
+        """
+        # Callers case-fold the text once, so the keywords are folded the
+        # same way and the patterns can skip case-insensitive matching
+        meeting, deadline, priority = (
+            tuple(dict.fromkeys(word.casefold() for word in words))
+            for words in (cls.MEETING_WORDS, cls.DEADLINE_WORDS, cls.HIGH_PRIORITY_WORDS)
+        )
+        cls._keyword_groups = ((meeting, _MEETING), (deadline, _DEADLINE),
+                               (priority, _PRIORITY))
+
+        for name, words in zip(cls._DERIVED_ATTRS, (meeting, deadline, priority)):
+            if name not in cls._regex_overrides:
+                setattr(cls, name, _keyword_regex(words))
+        # Derived regexes are already folded; custom ones may not be
+        flags = re.IGNORECASE if cls._regex_overrides else 0
+        cls.meeting_pattern = re.compile(cls.MEETING_KEYWORDS, flags)
+        cls.deadline_pattern = re.compile(cls.DEADLINE_KEYWORDS, flags)
+        cls.priority_pattern = re.compile(cls.HIGH_PRIORITY_KEYWORDS, flags)
+
+        # Every other matcher is built from the word lists, which custom
+        # regexes no longer describe
+        cls._regex_only = bool(cls._regex_overrides)
+        if cls._regex_only:
+            cls._hyperscan_db = cls._automaton = cls._jit_words = None
+            cls._use_jit = cls._tokenizable = False
+            return
+
+        # Keyword sets for token matching, which only works for keywords
+        # made of word characters (a token never contains "-" or " ")
+        cls._MEETING_SET = frozenset(meeting)
+        cls._DEADLINE_SET = frozenset(deadline)
+        cls._PRIORITY_SET = frozenset(priority)
+        cls._tokenizable = all(
+            all(map(_is_word_char, word)) for word in meeting + deadline + priority
+        )
+
+        # Substrings that every keyword contains; absence of all of them proves no match
+        cls._PREFILTER_WORDS = _minimal_literals(meeting + deadline + priority)
+
+        # Single-pass multi-keyword matchers (None when the library is missing)
+        cls._hyperscan_db = cls._build_hyperscan_db() if hyperscan is not None else None
+        # The database is shared, but a scan needs scratch space to itself
+        cls._hyperscan_local = threading.local()
+        cls._automaton = cls._build_automaton() if ahocorasick is not None else None
+        # The JIT scan only runs when Aho-Corasick is unavailable; its typed
+        # lists are built on first use, since building them compiles code
+        cls._use_jit = njit is not None and cls._automaton is None
+        cls._jit_words = None
+
     def __init__(self):
         """Initialize the EmailAgent."""
-        self.tasks: List[Task] = []
+        # Private so the indexes below cannot fall out of step with it; see tasks
+        self._tasks: List[Task] = []
         self.processed_emails: set = set()  # Track processed emails to avoid duplicates
+        # (description, task_type) of every stored task; mirrors Task equality
+        self._task_keys: Set[Tuple[str, str]] = set()
         
-        # Compile regex patterns for better performance
-        self.meeting_pattern = re.compile(self.MEETING_KEYWORDS, re.IGNORECASE)
-        self.deadline_pattern = re.compile(self.DEADLINE_KEYWORDS, re.IGNORECASE)
-        self.priority_pattern = re.compile(self.HIGH_PRIORITY_KEYWORDS, re.IGNORECASE)
+        # Columnar int8 codes parallel to self._tasks, for cache-friendly filtering
+        self._type_codes: Dict[str, int] = dict(self._TYPE_CODES)
+        self._priority_codes: Dict[str, int] = dict(self._PRIORITY_CODES)
+        self._type_column = array.array('b')
+        self._priority_column = array.array('b')
+        self._summary: Counter = Counter()
+
+    @classmethod
+    def _build_hyperscan_db(cls):
+        """
+        Compile the three keyword patterns into one Hyperscan database.
+
+        Pattern IDs are the match flags, so the match handler can OR them
+        together directly.
+        """
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[cls.MEETING_KEYWORDS.encode(),
+                         cls.DEADLINE_KEYWORDS.encode(),
+                         cls.HIGH_PRIORITY_KEYWORDS.encode()],
+            ids=[_MEETING, _DEADLINE, _PRIORITY],
+            elements=3,
+            flags=[hyperscan.HS_FLAG_SINGLEMATCH] * 3
+        )
+        return db
+
+    @classmethod
+    def _build_automaton(cls):
+        """
+        Build one Aho-Corasick automaton over all keyword classes.
+
+        Each keyword maps to (flags, length); a word such as "urgent" that
+        belongs to several classes carries all of their flags.
+        """
+        flags = defaultdict(int)
+        for words, flag in cls._keyword_groups:
+            for word in words:
+                flags[word] |= flag
+
+        automaton = ahocorasick.Automaton()
+        for word, flag in flags.items():
+            automaton.add_word(word, (flag, len(word)))
+        automaton.make_automaton()
+        return automaton
+
+    def _match_keywords(self, text: str) -> int:
+        """
+        Scan text for meeting/deadline/priority keywords.
+
+        Uses the fastest available matcher: Hyperscan, then Aho-Corasick,
+        then the Numba-compiled scan, then token-set matching (ASCII text)
+        or the compiled regexes. Classes with custom regexes always use
+        the regexes.
+
+        Args:
+            text: Case-folded text to scan
+
+        Returns:
+            Bitwise OR of the _MEETING, _DEADLINE and _PRIORITY flags found
+        """
+        if self._regex_only:
+            return self._match_regex(text)
+        # Hyperscan's \b is ASCII-only, so it only matches Python's \b on ASCII text
+        if self._hyperscan_db is not None and text.isascii():
+            return self._match_hyperscan(text)
+        if self._automaton is not None:
+            return self._match_automaton(text)
+        # Plain substring checks run in C and rule out most emails cheaply
+        if not any(word in text for word in self._PREFILTER_WORDS):
+            return 0
+        if self._use_jit:
+            return _jit_match_keywords(text, *self._get_jit_words())
+        if self._tokenizable and text.isascii():
+            return self._match_tokens(text)
+        return self._match_regex(text)
+
+    @classmethod
+    def _get_jit_words(cls) -> tuple:
+        """Return the keyword groups as numba typed lists, building them once."""
+        if cls._jit_words is None:
+            cls._jit_words = tuple(NumbaList(words) for words, _ in cls._keyword_groups)
+        return cls._jit_words
+
+    def _match_hyperscan(self, text: str) -> int:
+        """Scan text with the Hyperscan database."""
+        local = self._hyperscan_local
+        scratch = getattr(local, 'scratch', None)
+        if scratch is None:
+            # Scratch space cannot be shared between concurrent scans
+            scratch = local.scratch = hyperscan.Scratch(self._hyperscan_db)
+        hits = [0]
+        try:
+            self._hyperscan_db.scan(text.encode(), match_event_handler=_on_hyperscan_match,
+                                    context=hits, scratch=scratch)
+        except hyperscan.ScanTerminated:
+            pass
+        return hits[0]
+
+    def _match_automaton(self, text: str) -> int:
+        """Scan text with the Aho-Corasick automaton."""
+        last = len(text) - 1
+        hits = 0
+        for end, (flag, length) in self._automaton.iter(text):
+            start = end - length + 1
+            # Keep the \b semantics of the regex patterns
+            if start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if end < last and _is_word_char(text[end + 1]):
+                continue
+            hits |= flag
+            # A meeting hit outranks deadline, so nothing else can change
+            if hits & _RESOLVED == _RESOLVED:
+                break
+        return hits
+
+    def _match_tokens(self, text: str) -> int:
+        """
+        Match keywords by splitting ASCII text into words and probing the keyword sets.
+
+        For ASCII text the tokens are exactly the \\w+ runs the regex
+        patterns' \\b boundaries delimit, so results are identical.
+        """
+        tokens = set(text.translate(_NON_WORD_TABLE).split())
+        hits = 0 if self._PRIORITY_SET.isdisjoint(tokens) else _PRIORITY
+        if not self._MEETING_SET.isdisjoint(tokens):
+            hits |= _MEETING
+        elif not self._DEADLINE_SET.isdisjoint(tokens):
+            hits |= _DEADLINE
+        return hits
+
+    def _match_regex(self, text: str) -> int:
+        """Scan text with the compiled regex patterns."""
+        hits = _PRIORITY if self.priority_pattern.search(text) else 0
+        if self.meeting_pattern.search(text):
+            hits |= _MEETING
+        elif self.deadline_pattern.search(text):
+            hits |= _DEADLINE
+        return hits
 
     def perceive(self, emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -66,34 +410,42 @@ class EmailAgent:
             logger.warning("No emails provided to perceive")
             return []
         
-        valid_emails = []
-        for email in emails:
-            try:
-                # Validate email structure
-                if not isinstance(email, dict):
-                    logger.warning(f"Invalid email format: {type(email)}")
-                    continue
-                
-                if "subject" not in email and "body" not in email:
-                    logger.warning("Email missing both subject and body")
-                    continue
-                
-                # Create email hash for deduplication
-                email_hash = hash((email.get("subject", ""), email.get("body", "")))
-                if email_hash in self.processed_emails:
-                    logger.debug(f"Skipping duplicate email: {email.get('subject', 'No subject')}")
-                    continue
-                
-                self.processed_emails.add(email_hash)
-                valid_emails.append(email)
-                
-            except Exception as e:
-                logger.error(f"Error processing email: {e}")
-                continue
+        valid_emails = [email for email in emails if self._perceive_one(email)]
         
-        logger.info(f"Processed {len(valid_emails)} valid emails out of {len(emails)}")
+        logger.info("Processed %s valid emails out of %s", len(valid_emails), len(emails))
         return valid_emails
 
+    def _perceive_one(self, email: Any) -> bool:
+        """
+        Validate a single email and record it as processed.
+        
+        Args:
+            email: Candidate email dictionary
+            
+        Returns:
+            True if the email is valid and has not been seen before
+        """
+        # Validate email structure
+        if not isinstance(email, dict):
+            logger.warning("Invalid email format: %s", type(email))
+            return False
+        
+        if "subject" not in email and "body" not in email:
+            logger.warning("Email missing both subject and body")
+            return False
+        
+        # Create email hash for deduplication
+        subject = email.get("subject") or ""
+        body = email.get("body") or ""
+        email_hash = _fingerprint(subject, body)
+        if email_hash in self.processed_emails:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Skipping duplicate email: %s", subject or "No subject")
+            return False
+        
+        self.processed_emails.add(email_hash)
+        return True
+
     def reason(self, email: Dict[str, Any]) -> Dict[str, Any]:
         """
         Extract key info using optimized pattern matching.
@@ -104,37 +456,49 @@ class EmailAgent:
         Returns:
             Dictionary with 'type', 'priority', and 'content'
         """
-        try:
-            subject = email.get("subject", "")
-            body = email.get("body", "")
-            
-            # Combine subject and body for analysis (more efficient than separate checks)
-            combined_text = f"{subject} {body}"
-            
-            # Determine priority first (can be used for any type)
-            priority = "high" if self.priority_pattern.search(combined_text) else "normal"
-            
-            # Determine email type using compiled regex patterns
-            if self.meeting_pattern.search(combined_text):
-                email_type = "meeting"
-            elif self.deadline_pattern.search(combined_text):
-                email_type = "deadline"
-            else:
-                email_type = "misc"
-            
-            return {
-                "type": email_type,
-                "priority": priority,
-                "content": email
-            }
+        email_type, priority = self._classify(email)
+        return {
+            "type": email_type,
+            "priority": priority,
+            "content": email
+        }
+
+    def _classify(self, email: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Determine the type and priority of an email.
+        
+        Args:
+            email: Email dictionary with 'subject' and 'body' keys
             
-        except Exception as e:
-            logger.error(f"Error in reason() for email: {e}")
-            return {
-                "type": "misc",
-                "priority": "normal",
-                "content": email
-            }
+        Returns:
+            Tuple of (type, priority)
+        """
+        subject = email.get("subject") or ""
+        body = email.get("body") or ""
+        # perceive() accepts any field values; classify them as text
+        if not isinstance(subject, str):
+            subject = str(subject)
+        if not isinstance(body, str):
+            body = str(body)
+        
+        # Scan the short subject first; the body is only scanned when the
+        # subject alone leaves the type or priority undecided
+        hits = self._match_keywords(subject.casefold())
+        if hits & _RESOLVED != _RESOLVED:
+            hits |= self._match_keywords(body.casefold())
+        
+        # Determine priority first (can be used for any type)
+        priority = "high" if hits & _PRIORITY else "normal"
+        
+        # Meeting keywords take precedence over deadline keywords
+        if hits & _MEETING:
+            email_type = "meeting"
+        elif hits & _DEADLINE:
+            email_type = "deadline"
+        else:
+            email_type = "misc"
+        
+        return email_type, priority
 
     def act(self, info: Dict[str, Any]) -> List[Task]:
         """
@@ -146,68 +510,149 @@ class EmailAgent:
         Returns:
             List of all tasks
         """
-        try:
-            task_type = info.get("type", "misc")
-            priority = info.get("priority", "normal")
-            email = info.get("content", {})
-            
-            # Create task description based on type
-            task_descriptions = {
-                "meeting": "Follow up on meeting request.",
-                "deadline": "Check upcoming deadline.",
-                "misc": "Review misc email."
-            }
-            
-            description = task_descriptions.get(task_type, "Review email.")
-            
-            # Create new task
-            new_task = Task(
-                description=description,
-                task_type=task_type,
-                priority=priority,
-                source_email=email
-            )
-            
-            # Deduplication: only add if task doesn't already exist
-            if new_task not in self.tasks:
-                self.tasks.append(new_task)
-                logger.info(f"Created new task: {description} (type: {task_type}, priority: {priority})")
-            else:
-                logger.debug(f"Skipping duplicate task: {description}")
+        self._act_one(info)
+        return self.tasks
+
+    def _act_one(self, info: Dict[str, Any],
+                 created_at: Optional[datetime] = None) -> Optional[Task]:
+        """
+        Create the task for a single reasoned email.
+        
+        Args:
+            info: Dictionary with 'type', 'priority', and 'content' keys
+            created_at: Creation timestamp to use (default: now)
             
-            return self.tasks
+        Returns:
+            The new task, or None if an equal task already exists
+        """
+        task_type = info.get("type") or "misc"
+        priority = info.get("priority") or "normal"
+        email = info.get("content") or {}
+        
+        description = self._TASK_DESCRIPTIONS.get(task_type, "Review email.")
+        
+        # Deduplication: only build the task if it doesn't already exist
+        if (description, task_type) in self._task_keys:
+            logger.debug("Skipping duplicate task: %s", description)
+            return None
+        
+        task = Task(
+            description=description,
+            task_type=task_type,
+            created_at=created_at or datetime.now(),
+            priority=priority,
+            source_email=email
+        )
+        self._add_task(task)
+        logger.info("Created new task: %s (type: %s, priority: %s)", description, task_type, priority)
+        return task
+
+    def _pipeline(self, emails: Iterable[Any],
+                  created_at: Optional[datetime] = None) -> Iterator[Task]:
+        """
+        Stream emails through perceive -> reason -> act one at a time.
+        
+        Unlike calling perceive() first, no list of valid emails is built;
+        each email is validated, classified and acted on before the next.
+        
+        Args:
+            emails: Iterable of email dictionaries
+            created_at: Timestamp shared by every task created (default: now)
             
-        except Exception as e:
-            logger.error(f"Error in act(): {e}")
-            return self.tasks
+        Yields:
+            Each newly created task
+        """
+        created_at = created_at or datetime.now()
+        for email in emails:
+            if not self._perceive_one(email):
+                continue
+            task = self._act_one(self.reason(email), created_at)
+            if task is not None:
+                yield task
+
+    @property
+    def tasks(self) -> List[Task]:
+        """
+        All tasks, oldest first.
+        
+        Returns a copy: change the stored tasks through remove_task() and
+        clear_tasks(), which keep the type/priority indexes in step.
+        """
+        return list(self._tasks)
+
+    def clear_tasks(self) -> None:
+        """Remove every task."""
+        self._tasks.clear()
+        self._task_keys.clear()
+        del self._type_column[:]
+        del self._priority_column[:]
+        self._summary.clear()
+        logger.info("Removed all tasks")
+
+    def _add_task(self, task: Task) -> None:
+        """Store a new task and update every index."""
+        self._add_tasks((task,))
+
+    def _add_tasks(self, tasks: Sequence[Task]) -> None:
+        """Store several new tasks at once and update every index."""
+        self._task_keys.update((task.description, task.task_type) for task in tasks)
+        self._tasks.extend(tasks)
+        self._type_column.extend(
+            self._type_codes.setdefault(task.task_type, len(self._type_codes)) for task in tasks)
+        self._priority_column.extend(
+            self._priority_codes.setdefault(task.priority, len(self._priority_codes))
+            for task in tasks)
+        for task in tasks:
+            self._summary[task.task_type] += 1
+            self._summary[f"{task.task_type}_{task.priority}"] += 1
+
+    def _select_tasks(self, column: array.array, code: Optional[int]) -> List[Task]:
+        """Return the tasks whose entry in column equals code."""
+        if code is None:
+            return []
+        if np is not None:
+            indices = np.flatnonzero(np.frombuffer(column, dtype=np.int8) == code)
+            return [self._tasks[i] for i in indices.tolist()]
+        return [task for task, task_code in zip(self._tasks, column) if task_code == code]
 
     def get_tasks_by_type(self, task_type: str) -> List[Task]:
         """Get all tasks of a specific type."""
-        return [task for task in self.tasks if task.task_type == task_type]
+        return self._select_tasks(self._type_column, self._type_codes.get(task_type))
 
     def get_tasks_by_priority(self, priority: str) -> List[Task]:
         """Get all tasks of a specific priority."""
-        return [task for task in self.tasks if task.priority == priority]
+        return self._select_tasks(self._priority_column, self._priority_codes.get(priority))
 
     def remove_task(self, task: Task) -> bool:
         """Remove a specific task if it exists."""
-        if task in self.tasks:
-            self.tasks.remove(task)
-            logger.info(f"Removed task: {task.description}")
+        key = (task.description, task.task_type)
+        if key in self._task_keys:
+            # Equality ignores priority, so look up the stored instance
+            position = self._tasks.index(task)
+            stored = self._tasks.pop(position)
+            del self._type_column[position]
+            del self._priority_column[position]
+            self._task_keys.discard(key)
+            for summary_key in (stored.task_type, f"{stored.task_type}_{stored.priority}"):
+                self._summary[summary_key] -= 1
+                if not self._summary[summary_key]:
+                    del self._summary[summary_key]
+            logger.info("Removed task: %s", stored.description)
             return True
         return False
 
     def get_task_summary(self) -> Dict[str, int]:
         """Get summary statistics of tasks."""
-        summary = defaultdict(int)
-        for task in self.tasks:
-            summary[task.task_type] += 1
-            summary[f"{task.task_type}_{task.priority}"] += 1
-        return dict(summary)
+        return dict(self._summary)
+
+
+EmailAgent._compile_matchers()
 
 
 # --- Example usage ---
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
     emails = [
         {"subject": "Team Meeting Tomorrow", "body": "Please confirm attendance."},
         {"subject": "Deadline Reminder", "body": "Submit report by Friday. Urgent!"},
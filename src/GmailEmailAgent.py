@@ -3,16 +3,18 @@ Gmail-enabled EmailAgent that integrates with Gmail API.
 """
 
 import logging
+from collections import OrderedDict
+from datetime import datetime
 from typing import List, Dict, Any, Optional
 
 try:
     # Try relative imports first (when used as a package)
     from .EmailAgent_optimized import EmailAgent, Task
-    from .GmailIntegration import GmailIntegration
+    from .GmailIntegration import Email, GmailIntegration
 except ImportError:
     # Fall back to absolute imports (when run directly)
     from EmailAgent_optimized import EmailAgent, Task
-    from GmailIntegration import GmailIntegration
+    from GmailIntegration import Email, GmailIntegration
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,11 @@ class GmailEmailAgent(EmailAgent):
     Extends EmailAgent to work directly with Gmail API.
     """
     
+    # Maximum number of Gmail message IDs remembered as already processed
+    SEEN_IDS_SIZE = 10000
+    
+    __slots__ = ("gmail", "authenticated", "_seen_ids")
+    
     def __init__(self, credentials_path: str = "credentials.json", 
                  token_path: str = "token.json"):
         """
@@ -36,6 +43,8 @@ class GmailEmailAgent(EmailAgent):
         super().__init__()
         self.gmail = GmailIntegration(credentials_path, token_path)
         self.authenticated = False
+        # Gmail message IDs already handed to perceive(), oldest first (FIFO eviction)
+        self._seen_ids: "OrderedDict[str, None]" = OrderedDict()
     
     def connect(self) -> bool:
         """
@@ -72,56 +81,83 @@ class GmailEmailAgent(EmailAgent):
         
         # Fetch emails from Gmail
         if fetch_unread:
-            emails = self.gmail.fetch_unread_emails(max_results=max_results)
-        else:
-            emails = self.gmail.fetch_emails(
-                max_results=max_results,
-                query=query,
-                label_ids=label_ids
-            )
-        
-        if not emails:
+            query, label_ids = "is:unread", ["INBOX"]
+        
+        # Classify each batch as soon as it has been fetched; all tasks from
+        # one pull share a single timestamp
+        batch_ts = datetime.now()
+        fetched = created = 0
+        for emails in self.gmail.iter_email_batches(
+            max_results=max_results,
+            query=query,
+            label_ids=label_ids
+        ):
+            fetched += len(emails)
+            created += len(self._process_batch(emails, batch_ts))
+        
+        if not fetched:
             logger.info("No emails found to process")
             return []
         
-        # Convert Gmail format to EmailAgent format and process
-        processed_emails = self._convert_gmail_to_agent_format(emails)
-        
-        # Process through perceive -> reason -> act pipeline
-        valid_emails = self.perceive(processed_emails)
+        logger.info("Processed %s emails, created %s new tasks", fetched, created)
+        return self.tasks
+    
+    def _process_batch(self, emails: List[Email],
+                       created_at: Optional[datetime] = None) -> List[Task]:
+        """
+        Run a batch of Gmail emails through the perceive -> reason -> act pipeline.
         
-        for email in valid_emails:
-            info = self.reason(email)
-            self.act(info)
+        Emails are streamed through _pipeline() one at a time, so no
+        intermediate list of valid emails or classifications is built.
         
-        logger.info(f"Processed {len(valid_emails)} emails, created {len(self.tasks)} tasks")
-        return self.tasks
+        Args:
+            emails: List of Gmail Email records
+            created_at: Timestamp shared by every task created (default: now)
+            
+        Returns:
+            List of newly created tasks
+        """
+        # Convert Gmail format to EmailAgent format and process
+        processed_emails = self._convert_gmail_to_agent_format(emails)
+        return list(self._pipeline(processed_emails, created_at))
     
-    def _convert_gmail_to_agent_format(self, gmail_emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _convert_gmail_to_agent_format(self, gmail_emails: List[Email]) -> List[Dict[str, Any]]:
         """
         Convert Gmail email format to EmailAgent expected format.
         
+        Messages whose Gmail ID this agent has already converted are skipped
+        before conversion, since perceive() would drop them as duplicates.
+        The last SEEN_IDS_SIZE IDs are remembered.
+        
         Args:
-            gmail_emails: List of Gmail email dictionaries
+            gmail_emails: List of Gmail Email records
             
         Returns:
             List of emails in EmailAgent format
         """
         converted = []
+        seen_ids = self._seen_ids
         for email in gmail_emails:
+            gmail_id = email.id
+            if gmail_id is not None:
+                if gmail_id in seen_ids:
+                    continue
+                seen_ids[gmail_id] = None
+                if len(seen_ids) > self.SEEN_IDS_SIZE:
+                    seen_ids.popitem(last=False)
+            
             # EmailAgent expects: {'subject': str, 'body': str}
-            # Gmail provides: {'subject': str, 'body': str, 'from': str, 'date': str, ...}
-            agent_email = {
-                'subject': email.get('subject', ''),
-                'body': email.get('body', ''),
+            # Gmail provides: Email(subject, body, from_, date, ...)
+            converted.append({
+                'subject': email.subject,
+                'body': email.body,
                 # Preserve additional Gmail metadata for potential future use
-                'gmail_id': email.get('id'),
-                'from': email.get('from', ''),
-                'date': email.get('date', ''),
-                'snippet': email.get('snippet', ''),
-                'labels': email.get('labels', [])
-            }
-            converted.append(agent_email)
+                'gmail_id': gmail_id,
+                'from': email.from_,
+                'date': email.date,
+                'snippet': email.snippet,
+                'labels': email.labels
+            })
         
         return converted
     
@@ -145,13 +181,7 @@ class GmailEmailAgent(EmailAgent):
         if not emails:
             return []
         
-        processed_emails = self._convert_gmail_to_agent_format(emails)
-        valid_emails = self.perceive(processed_emails)
-        
-        for email in valid_emails:
-            info = self.reason(email)
-            self.act(info)
-        
+        self._process_batch(emails)
         return self.tasks
     
     def mark_emails_processed(self, task: Task) -> bool:
@@ -173,6 +203,6 @@ class GmailEmailAgent(EmailAgent):
         
         # This would require additional scope: 'https://www.googleapis.com/auth/gmail.modify'
         # For now, just log the action
-        logger.info(f"Would mark email {task.source_email['gmail_id']} as processed")
+        logger.info("Would mark email %s as processed", task.source_email['gmail_id'])
         return False  # Not implemented for read-only access
 
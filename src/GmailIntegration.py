@@ -5,45 +5,269 @@ This module provides functionality to authenticate with Gmail and fetch emails.
 """
 
 import os
-import base64
+import json
+import time
+import asyncio
+import sqlite3
+import binascii
+import random
 import logging
-from typing import List, Dict, Any, Optional
-from email.utils import parsedate_to_datetime
-from datetime import datetime, timedelta
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from itertools import islice
+from types import MappingProxyType
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from email.utils import mktime_tz, parsedate_tz
+from datetime import datetime, timedelta, timezone
 
 try:
+    import google_auth_httplib2
     from google.auth.transport.requests import Request
     from google.oauth2.credentials import Credentials
     from google_auth_oauthlib.flow import InstalledAppFlow
     from googleapiclient.discovery import build
     from googleapiclient.errors import HttpError
+    from googleapiclient.http import BatchHttpRequest, build_http
+    from googleapiclient.model import JsonModel
 except ImportError:
     raise ImportError(
         "Gmail API libraries not installed. Install with: pip install google-auth google-auth-oauthlib google-auth-httplib2 google-api-python-client"
     )
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None  # Optional: fetch_emails_async falls back to a worker thread
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional: API responses are parsed with the json module
+
 logger = logging.getLogger(__name__)
 
 # Gmail API scopes - read-only access to emails
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
+# Gmail-specific batch endpoint (the global batch endpoint is deprecated)
+GMAIL_BATCH_URI = 'https://gmail.googleapis.com/batch/gmail/v1'
+
+# Gmail rejects batch requests with more sub-requests than this
+MAX_BATCH_SIZE = 100
+
+# REST endpoint used by the aiohttp fetch path
+GMAIL_MESSAGES_URL = 'https://gmail.googleapis.com/gmail/v1/users/me/messages'
+
+# Sub-request statuses that are worth resubmitting, and how hard to try
+RETRY_STATUSES = frozenset({429, 500, 503})
+MAX_BATCH_RETRIES = 5
+
+# Sub-request statuses that no later attempt will fix (bad ID, message gone)
+PERMANENT_STATUSES = frozenset({400, 404, 410})
+MAX_BACKOFF_SECONDS = 32
+
+# Batch requests in flight at once; Gmail throttles much beyond this
+MAX_FETCH_WORKERS = 4
+
+# Partial-response projections: only the parts of a message _parse_message reads
+MESSAGE_FIELDS = 'id,threadId,labelIds,snippet,payload(headers,body,parts)'
+METADATA_FIELDS = 'id,threadId,labelIds,snippet,payload/headers'
+METADATA_HEADERS = ['Subject', 'From', 'To', 'Date']
+_WANTED_HEADERS = frozenset(name.lower() for name in METADATA_HEADERS)
+
+# On-disk cache of parsed messages; message content never changes once sent
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'email_agent')
+MESSAGE_CACHE_PATH = os.path.join(CACHE_DIR, 'messages.db')
+
+# Bump whenever the cached payload format changes; older caches are discarded
+CACHE_SCHEMA_VERSION = 1
+
+# Last synced mailbox historyId per token, for incremental fetch_recent_emails
+SYNC_STATE_PATH = os.path.join(CACHE_DIR, 'state.json')
+
+# Largest page messages.list returns; bigger fetches follow nextPageToken
+MAX_LIST_PAGE_SIZE = 500
+
+# Parameters shared by every messages.list call; defaults such as
+# includeSpamTrash=False are left to the server to keep URLs short
+_BASE_LIST_PARAMS = MappingProxyType({'userId': 'me'})
+
+# Refresh access tokens this long before they actually expire
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+# Seconds a loaded token file is trusted before it is re-read from disk
+TOKEN_CACHE_TTL = 55 * 60
+
+# Loaded credentials shared by every GmailIntegration, keyed by token path:
+# ((st_mtime_ns, st_size) of the file when loaded, credentials, load time)
+_CREDS_CACHE: Dict[str, Tuple[Tuple[int, int], Credentials, float]] = {}
+
+# Maps the base64url alphabet onto the standard one understood by binascii
+_B64_URLSAFE = bytes.maketrans(b'-_', b'+/')
+
+
+class _OrjsonModel(JsonModel):
+    """JsonModel that parses API responses with orjson."""
+    
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().deserialize(content)
+        if self._data_wrapper and isinstance(body, dict) and 'data' in body:
+            body = body['data']
+        return body
+
+
+# Response model handed to build(); None keeps the client's default JsonModel
+_JSON_MODEL = _OrjsonModel() if orjson is not None else None
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _decode_body(data: str) -> str:
+    """Decode a base64url Gmail body part to text, tolerating missing padding."""
+    raw = binascii.a2b_base64(data.encode('ascii').translate(_B64_URLSAFE) + b'===')
+    return raw.decode('utf-8', errors='ignore')
+
+
+@dataclass(slots=True)
+class Email:
+    """A message fetched from Gmail."""
+    id: str
+    subject: str
+    body: str
+    from_: str
+    to: str
+    date: str
+    snippet: str
+    thread_id: str
+    labels: List[str]
+
+
+def parse_email_date(email: Email) -> datetime:
+    """
+    Parse the date of a fetched email.
+    
+    Emails carry their raw Date header so that fetching never pays for date
+    parsing; call this only where the datetime is actually needed.
+    
+    Args:
+        email: Email returned by GmailIntegration
+        
+    Returns:
+        The email's date as an aware UTC datetime, or the current time if
+        it is missing or malformed
+    """
+    date_str = email.date
+    if not date_str:
+        return datetime.now(timezone.utc)
+    parsed = _fast_parsedate(date_str)
+    return parsed if parsed is not None else datetime.now(timezone.utc)
+
+
+def _fast_parsedate(date_str: str) -> Optional[datetime]:
+    """
+    Parse an RFC 2822 date into an aware UTC datetime.
+    
+    Goes through parsedate_tz/mktime_tz to a POSIX timestamp instead of
+    parsedate_to_datetime, which builds a tzinfo object for every offset.
+    
+    Args:
+        date_str: Date header value
+        
+    Returns:
+        The parsed datetime, or None if date_str is not an RFC 2822 date
+    """
+    parsed = parsedate_tz(date_str)
+    if parsed is None:
+        return None
+    try:
+        return datetime.fromtimestamp(mktime_tz(parsed), tz=timezone.utc)
+    except (OverflowError, ValueError, OSError):
+        return None
+
+
+def _email_from_json(payload: str) -> Email:
+    """Rebuild an Email stored in the message cache by _cache_store()."""
+    return Email(**_json_loads(payload))
+
+
+@lru_cache(maxsize=8)
+def _query_after(day: str) -> str:
+    """Gmail search query for messages after day (YYYY/MM/DD)."""
+    return f"after:{day}"
+
+
+def _recent_query(days: int) -> str:
+    """Gmail search query for messages from the last days days."""
+    date_query = datetime.now() - timedelta(days=days)
+    return _query_after(date_query.strftime("%Y/%m/%d"))
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime in ns, size) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _log_fetch_errors(errors: List[Tuple[str, Exception]], total: int) -> None:
+    """Log the messages of one fetch that could not be retrieved or parsed."""
+    logger.warning(
+        "Failed to fetch %s of %s messages: %s", len(errors), total,
+        "; ".join("%s: %s" % (msg_id, error) for msg_id, error in errors)
+    )
+
+
+def _check_batch_size(batch_size: int) -> int:
+    """Validate batch_size, clamping it to Gmail's batch limit."""
+    if batch_size <= 0:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+    if batch_size > MAX_BATCH_SIZE:
+        logger.warning("batch_size %s exceeds Gmail's limit, using %s",
+                       batch_size, MAX_BATCH_SIZE)
+        return MAX_BATCH_SIZE
+    return batch_size
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Split items into lists of at most size elements."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
 
 class GmailIntegration:
     """Handles Gmail API authentication and email fetching."""
     
     def __init__(self, credentials_path: str = "credentials.json", 
-                 token_path: str = "token.json"):
+                 token_path: str = "token.json",
+                 cache_path: Optional[str] = MESSAGE_CACHE_PATH):
         """
         Initialize Gmail integration.
         
         Args:
             credentials_path: Path to OAuth2 credentials JSON file
             token_path: Path to store/load OAuth2 token
+            cache_path: SQLite file caching parsed messages across runs
+                (None disables the cache)
         """
         self.credentials_path = credentials_path
         self.token_path = token_path
+        self.cache_path = cache_path
         self.service = None
         self.creds = None
+        self._local = threading.local()
+        self._cache_db = None
+        self._cache_lock = threading.Lock()
         
     def authenticate(self) -> bool:
         """
@@ -52,162 +276,771 @@ class GmailIntegration:
         Returns:
             True if authentication successful, False otherwise
         """
+        # Already authenticated: the service refreshes its credentials in place
+        if self.service is not None and self.creds and not self._expires_soon(self.creds):
+            return True
+        
+        previous_creds = self.creds
         try:
             # Load existing token if available
-            if os.path.exists(self.token_path):
-                self.creds = Credentials.from_authorized_user_file(
-                    self.token_path, SCOPES
-                )
-                logger.info("Loaded existing credentials from token.json")
+            if self.creds is None:
+                self.creds = self._load_credentials()
             
-            # If there are no (valid) credentials available, let the user log in
-            if not self.creds or not self.creds.valid:
-                if self.creds and self.creds.expired and self.creds.refresh_token:
-                    logger.info("Refreshing expired credentials")
-                    self.creds.refresh(Request())
-                else:
-                    if not os.path.exists(self.credentials_path):
-                        logger.error(
-                            f"Credentials file not found: {self.credentials_path}\n"
-                            "Please download credentials.json from Google Cloud Console"
-                        )
-                        return False
-                    
-                    logger.info("Starting OAuth2 flow")
-                    flow = InstalledAppFlow.from_client_secrets_file(
-                        self.credentials_path, SCOPES
+            did_refresh = False
+            if (self.creds and self.creds.refresh_token
+                    and self._expires_soon(self.creds)):
+                logger.info("Refreshing expiring credentials")
+                self.creds.refresh(Request())
+                did_refresh = True
+            elif not self.creds or not self.creds.valid:
+                # No usable credentials available, let the user log in
+                if not os.path.exists(self.credentials_path):
+                    logger.error(
+                        "Credentials file not found: %s\n"
+                        "Please download credentials.json from Google Cloud Console",
+                        self.credentials_path
                     )
-                    self.creds = flow.run_local_server(port=0)
+                    return False
                 
-                # Save credentials for next run
+                logger.info("Starting OAuth2 flow")
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    self.credentials_path, SCOPES
+                )
+                self.creds = flow.run_local_server(port=0)
+                did_refresh = True
+            
+            # Save credentials for next run, only when they changed
+            if did_refresh:
                 with open(self.token_path, 'w') as token:
                     token.write(self.creds.to_json())
-                logger.info(f"Saved credentials to {self.token_path}")
+                logger.info("Saved credentials to %s", self.token_path)
+                _CREDS_CACHE[self.token_path] = (
+                    _file_signature(self.token_path), self.creds, time.monotonic()
+                )
             
-            # Build Gmail service
-            self.service = build('gmail', 'v1', credentials=self.creds)
+            # Build the Gmail service from the discovery document bundled with
+            # google-api-python-client rather than a network fetch; reuse it
+            # until the credentials object itself is replaced (refreshes
+            # happen in place)
+            if self.service is None or self.creds is not previous_creds:
+                # Worker connections wrap the credentials too
+                self._local = threading.local()
+                self.service = build(
+                    'gmail', 'v1', credentials=self.creds,
+                    cache_discovery=True, static_discovery=True,
+                    model=_JSON_MODEL
+                )
             logger.info("Successfully authenticated with Gmail API")
             return True
             
         except Exception as e:
-            logger.error(f"Authentication failed: {e}")
+            logger.error("Authentication failed: %s", e)
             return False
     
+    def _load_credentials(self) -> Optional[Credentials]:
+        """
+        Load credentials from token_path, reusing an earlier load when the
+        file is unchanged and was read less than TOKEN_CACHE_TTL ago.
+        
+        Returns:
+            The stored credentials, or None if there is no token file
+        """
+        signature = _file_signature(self.token_path)
+        if signature is None:
+            return None
+        
+        entry = _CREDS_CACHE.get(self.token_path)
+        if entry is not None:
+            cached_signature, creds, loaded_at = entry
+            if (cached_signature == signature
+                    and time.monotonic() - loaded_at < TOKEN_CACHE_TTL):
+                return creds
+        
+        creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
+        logger.info("Loaded existing credentials from token.json")
+        _CREDS_CACHE[self.token_path] = (signature, creds, time.monotonic())
+        return creds
+    
+    @staticmethod
+    def _expires_soon(creds: Credentials) -> bool:
+        """
+        Check whether credentials expire within TOKEN_REFRESH_MARGIN.
+        
+        Args:
+            creds: OAuth2 credentials
+        
+        Returns:
+            True if the access token should be refreshed now
+        """
+        if creds.expiry is None:
+            return not creds.valid
+        # google-auth stores expiry as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return creds.expiry - now < TOKEN_REFRESH_MARGIN
+    
     def fetch_emails(self, 
                      max_results: int = 10,
                      query: Optional[str] = None,
                      label_ids: Optional[List[str]] = None,
-                     include_spam_trash: bool = False) -> List[Dict[str, Any]]:
+                     include_spam_trash: bool = False,
+                     batch_size: int = 50,
+                     metadata_only: bool = False) -> List[Email]:
         """
         Fetch emails from Gmail.
         
+        Emails are returned in listing order (newest first), whether they
+        came from the cache or from the API.
+        
         Args:
             max_results: Maximum number of emails to fetch (default: 10)
             query: Gmail search query (e.g., "is:unread", "from:example@gmail.com")
             label_ids: List of label IDs to filter by (e.g., ["INBOX"])
             include_spam_trash: Whether to include spam and trash
+            batch_size: Messages per batch HTTP request (default: 50, at most
+                MAX_BATCH_SIZE)
+            metadata_only: Fetch headers only and use the snippet as the body
             
         Returns:
-            List of email dictionaries with 'subject', 'body', 'from', 'date', etc.
+            List of Email records (subject, body, from_, date, ...)
+            
+        Raises:
+            ValueError: If batch_size is not positive
+        """
+        batch_size = _check_batch_size(batch_size)
+        listed = []
+        email_list = []
+        for emails in self._iter_email_batches(
+            max_results, query, label_ids, include_spam_trash,
+            batch_size, metadata_only, listed
+        ):
+            email_list.extend(emails)
+        
+        # Batches complete out of order; put them back in listing order
+        rank = {msg_id: i for i, msg_id in enumerate(listed)}
+        email_list.sort(key=lambda email: rank.get(email.id, len(rank)))
+        return email_list
+    
+    def iter_email_batches(self,
+                           max_results: int = 10,
+                           query: Optional[str] = None,
+                           label_ids: Optional[List[str]] = None,
+                           include_spam_trash: bool = False,
+                           batch_size: int = 50,
+                           metadata_only: bool = False) -> Iterator[List[Email]]:
+        """
+        Fetch emails from Gmail, yielding them in batches as they arrive.
+        
+        Message IDs are listed page by page, and each batch_size IDs are
+        dispatched as one Gmail batch HTTP request as soon as they are
+        listed, instead of one round trip per message. Up to
+        MAX_FETCH_WORKERS batches run concurrently and each one is yielded
+        as soon as it completes, so batches are unordered: cached messages
+        come first, then fetched batches in completion order. Use
+        fetch_emails() when listing order matters.
+        
+        Args:
+            max_results: Maximum number of emails to fetch (default: 10)
+            query: Gmail search query (e.g., "is:unread", "from:example@gmail.com")
+            label_ids: List of label IDs to filter by (e.g., ["INBOX"])
+            include_spam_trash: Whether to include spam and trash
+            batch_size: Messages per batch HTTP request (default: 50, at most
+                MAX_BATCH_SIZE)
+            metadata_only: Fetch headers only and use the snippet as the body
+            
+        Yields:
+            Lists of Email records
+            
+        Raises:
+            ValueError: If batch_size is not positive
+        """
+        batch_size = _check_batch_size(batch_size)
+        yield from self._iter_email_batches(
+            max_results, query, label_ids, include_spam_trash,
+            batch_size, metadata_only
+        )
+    
+    def _iter_email_batches(self,
+                            max_results: int,
+                            query: Optional[str],
+                            label_ids: Optional[List[str]],
+                            include_spam_trash: bool,
+                            batch_size: int,
+                            metadata_only: bool,
+                            listed: Optional[List[str]] = None) -> Iterator[List[Email]]:
+        """
+        List and fetch messages for iter_email_batches() and fetch_emails().
+        
+        Args:
+            max_results: Maximum number of emails to fetch
+            query: Gmail search query
+            label_ids: List of label IDs to filter by
+            include_spam_trash: Whether to include spam and trash
+            batch_size: Messages per batch HTTP request
+            metadata_only: Fetch headers only and use the snippet as the body
+            listed: If given, receives every listed message ID in listing order
+            
+        Yields:
+            Lists of Email records
         """
         if not self.service:
             logger.error("Not authenticated. Call authenticate() first.")
-            return []
+            return
         
         try:
-            # Build query parameters
-            params = {
-                'maxResults': max_results,
-                'includeSpamTrash': include_spam_trash
-            }
-            
-            if query:
-                params['q'] = query
-            
-            if label_ids:
-                params['labelIds'] = label_ids
-            
-            # Fetch message list
-            logger.info(f"Fetching up to {max_results} emails...")
-            results = self.service.users().messages().list(
-                userId='me', **params
-            ).execute()
-            
-            messages = results.get('messages', [])
-            logger.info(f"Found {len(messages)} messages")
-            
-            if not messages:
-                logger.info("No messages found")
-                return []
-            
-            # Fetch full message details
-            email_list = []
-            for msg in messages:
-                try:
-                    email_dict = self._get_message_details(msg['id'])
-                    if email_dict:
-                        email_list.append(email_dict)
-                except Exception as e:
-                    logger.warning(f"Error fetching message {msg['id']}: {e}")
-                    continue
+            params = self._list_params(max_results, query, label_ids, include_spam_trash)
             
-            logger.info(f"Successfully fetched {len(email_list)} emails")
+            logger.info("Fetching up to %s emails...", max_results)
+            yield from self._iter_details(
+                self._iter_ids(params, max_results), batch_size, metadata_only,
+                listed
+            )
+            
+        except HttpError as error:
+            logger.error("Gmail API error: %s", error)
+        except Exception as e:
+            logger.error("Error fetching emails: %s", e)
+    
+    def _iter_ids(self, params: Dict[str, Any], max_results: int) -> Iterator[str]:
+        """
+        List message IDs lazily, following nextPageToken across pages.
+        
+        Args:
+            params: messages().list() keyword arguments from _list_params()
+            max_results: Maximum number of IDs to yield
+            
+        Yields:
+            Gmail message IDs
+        """
+        messages = self.service.users().messages()
+        request = messages.list(**params)
+        remaining = max_results
+        while request is not None and remaining > 0:
+            response = request.execute()
+            for msg in response.get('messages', [])[:remaining]:
+                yield msg['id']
+                remaining -= 1
+            request = messages.list_next(request, response)
+    
+    def _iter_details(self, msg_ids: Iterable[str],
+                      batch_size: int = 50,
+                      metadata_only: bool = False,
+                      listed: Optional[List[str]] = None,
+                      unfinished: Optional[List[str]] = None) -> Iterator[List[Email]]:
+        """
+        Fetch message details, yielding each batch as it completes.
+        
+        msg_ids may be a lazy iterator; every batch_size IDs are looked up in
+        the cache and the misses dispatched before the next ID is consumed.
+        On an injected service (no credentials of our own) the IDs are all
+        consumed first, since the listing and the fetch share one Http.
+        
+        Args:
+            msg_ids: Gmail message IDs
+            batch_size: Messages per batch HTTP request
+            metadata_only: Fetch headers only and use the snippet as the body
+            listed: If given, receives every message ID as it is consumed
+            unfinished: If given, receives the IDs that failed but may
+                succeed on a later call (see _fetch_batch)
+            
+        Yields:
+            Lists of Email records
+        """
+        batch_size = _check_batch_size(batch_size)
+        total = from_cache = fetched = 0
+        
+        def collect(future):
+            email_list = future.result()
+            self._cache_store(email_list, metadata_only)
             return email_list
+        
+        # Each worker needs its own HTTP connection, which requires our
+        # own credentials; fall back to one worker on an injected service
+        workers = MAX_FETCH_WORKERS if self.creds is not None else 1
+        if self.creds is None:
+            # That worker shares the service's Http with a lazy listing
+            # here, so finish listing before dispatching any batch
+            msg_ids = list(msg_ids)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = set()
+            for chunk in _chunks(msg_ids, batch_size):
+                total += len(chunk)
+                if listed is not None:
+                    listed.extend(chunk)
+                cached = self._cache_lookup(chunk, metadata_only)
+                if cached:
+                    from_cache += len(cached)
+                    yield list(cached.values())
+                misses = [msg_id for msg_id in chunk if msg_id not in cached]
+                if misses:
+                    futures.add(executor.submit(
+                        self._fetch_chunk, misses, metadata_only, unfinished
+                    ))
+                
+                # Hand over batches that finished while we were listing
+                done = {future for future in futures if future.done()}
+                futures -= done
+                for future in done:
+                    email_list = collect(future)
+                    fetched += len(email_list)
+                    yield email_list
             
+            for future in as_completed(futures):
+                email_list = collect(future)
+                fetched += len(email_list)
+                yield email_list
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        if not total:
+            logger.info("No messages found")
+            return
+        logger.info("Successfully fetched %s of %s emails (%s from cache)",
+                    from_cache + fetched, total, from_cache)
+    
+    async def fetch_emails_async(self,
+                                 max_results: int = 10,
+                                 query: Optional[str] = None,
+                                 label_ids: Optional[List[str]] = None,
+                                 include_spam_trash: bool = False,
+                                 metadata_only: bool = False) -> List[Email]:
+        """
+        Fetch emails from Gmail with concurrent aiohttp requests.
+        
+        Message details are fetched with one messages.get call per message,
+        up to 32 in flight over a shared connection pool. Without aiohttp
+        installed, or on an injected service without credentials of our
+        own (there is no token to send), this runs fetch_emails() in a
+        worker thread instead. Like fetch_emails(), emails are returned in
+        listing order.
+        
+        Args:
+            max_results: Maximum number of emails to fetch (default: 10)
+            query: Gmail search query (e.g., "is:unread", "from:example@gmail.com")
+            label_ids: List of label IDs to filter by (e.g., ["INBOX"])
+            include_spam_trash: Whether to include spam and trash
+            metadata_only: Fetch headers only and use the snippet as the body
+            
+        Returns:
+            List of Email records
+        """
+        if aiohttp is None or (self.service and self.creds is None):
+            return await asyncio.to_thread(
+                self.fetch_emails,
+                max_results=max_results,
+                query=query,
+                label_ids=label_ids,
+                include_spam_trash=include_spam_trash,
+                metadata_only=metadata_only
+            )
+        
+        if not self.service:
+            logger.error("Not authenticated. Call authenticate() first.")
+            return []
+        
+        if self._expires_soon(self.creds) and not self.authenticate():
+            return []
+        
+        params = self._list_params(max_results, query, label_ids, include_spam_trash)
+        logger.info("Fetching up to %s emails...", max_results)
+        try:
+            msg_ids = await asyncio.to_thread(
+                lambda: list(self._iter_ids(params, max_results))
+            )
         except HttpError as error:
-            logger.error(f"Gmail API error: {error}")
+            logger.error("Gmail API error: %s", error)
             return []
-        except Exception as e:
-            logger.error(f"Error fetching emails: {e}")
+        
+        logger.info("Found %s messages", len(msg_ids))
+        if not msg_ids:
+            logger.info("No messages found")
             return []
+        
+        rank = {msg_id: i for i, msg_id in enumerate(msg_ids)}
+        cached = self._cache_lookup(msg_ids, metadata_only)
+        email_list = list(cached.values())
+        msg_ids = [msg_id for msg_id in msg_ids if msg_id not in cached]
+        
+        if metadata_only:
+            get_params = [('format', 'metadata'), ('fields', METADATA_FIELDS)]
+            get_params.extend(('metadataHeaders', name) for name in METADATA_HEADERS)
+        else:
+            get_params = [('format', 'full'), ('fields', MESSAGE_FIELDS)]
+        headers = {'Authorization': f'Bearer {self.creds.token}'}
+        
+        connector = aiohttp.TCPConnector(limit=32, limit_per_host=16)
+        async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+            responses = await asyncio.gather(
+                *[self._get_message_async(session, msg_id, get_params)
+                  for msg_id in msg_ids],
+                return_exceptions=True
+            )
+        
+        fresh = []
+        errors = []
+        for msg_id, response in zip(msg_ids, responses):
+            if isinstance(response, BaseException):
+                errors.append((msg_id, response))
+                continue
+            try:
+                fresh.append(self._parse_message(response, metadata_only))
+            except Exception as e:
+                errors.append((msg_id, e))
+        if errors:
+            _log_fetch_errors(errors, len(msg_ids))
+        self._cache_store(fresh, metadata_only)
+        email_list.extend(fresh)
+        email_list.sort(key=lambda email: rank.get(email.id, len(rank)))
+        
+        logger.info("Successfully fetched %s emails", len(email_list))
+        return email_list
     
-    def _get_message_details(self, msg_id: str) -> Optional[Dict[str, Any]]:
+    async def _get_message_async(self, session: Any, msg_id: str,
+                                 params: List[Any]) -> Dict[str, Any]:
         """
-        Get full details of a message by ID.
+        Fetch one message resource over aiohttp, retrying throttled requests.
         
         Args:
+            session: aiohttp.ClientSession carrying the Authorization header
             msg_id: Gmail message ID
+            params: Query parameters for messages.get
             
         Returns:
-            Dictionary with email details or None if error
+            The message resource
         """
+        url = f'{GMAIL_MESSAGES_URL}/{msg_id}'
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            async with session.get(url, params=params) as response:
+                if response.status in RETRY_STATUSES and attempt < MAX_BATCH_RETRIES:
+                    delay = self._backoff_delay(attempt, [response.headers.get('Retry-After')])
+                else:
+                    response.raise_for_status()
+                    return _json_loads(await response.read())
+            await asyncio.sleep(delay)
+    
+    def _open_cache(self) -> Optional[sqlite3.Connection]:
+        """
+        Open the message cache on first use.
+        
+        Returns:
+            The SQLite connection, or None if the cache is disabled or unusable
+        """
+        if self._cache_db is None and self.cache_path:
+            try:
+                # Cached messages are mail contents: keep them private to the user
+                cache_dir = os.path.dirname(self.cache_path)
+                if cache_dir:
+                    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+                os.close(os.open(self.cache_path, os.O_RDWR | os.O_CREAT, 0o600))
+                os.chmod(self.cache_path, 0o600)
+                db = sqlite3.connect(self.cache_path, check_same_thread=False)
+                if db.execute("PRAGMA user_version").fetchone()[0] != CACHE_SCHEMA_VERSION:
+                    # Written by another version (or new): start from scratch
+                    with db:
+                        db.execute("DROP TABLE IF EXISTS msgs")
+                        db.execute(
+                            "CREATE TABLE msgs ("
+                            "id TEXT NOT NULL, format TEXT NOT NULL, payload TEXT NOT NULL, "
+                            "fetched_at INTEGER NOT NULL, PRIMARY KEY (id, format))"
+                        )
+                        db.execute("PRAGMA user_version = %d" % CACHE_SCHEMA_VERSION)
+                self._cache_db = db
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("Message cache disabled: %s", e)
+                self.cache_path = None
+        return self._cache_db
+    
+    def _cache_lookup(self, msg_ids: List[str],
+                      metadata_only: bool = False) -> Dict[str, Email]:
+        """
+        Load previously parsed messages from the cache.
+        
+        Labels are returned as they were when the message was first fetched.
+        Unreadable rows, and the whole lookup if the database fails, count
+        as cache misses.
+        
+        Args:
+            msg_ids: Gmail message IDs
+            metadata_only: Look up metadata-only entries instead of full ones
+            
+        Returns:
+            Dictionary mapping cached message IDs to Email records
+        """
+        db = self._open_cache()
+        if db is None or not msg_ids:
+            return {}
+        
+        fmt = 'metadata' if metadata_only else 'full'
+        found = {}
         try:
-            message = self.service.users().messages().get(
-                userId='me', id=msg_id, format='full'
-            ).execute()
+            with self._cache_lock:
+                for chunk in _chunks(msg_ids, 500):
+                    rows = db.execute(
+                        "SELECT id, payload FROM msgs WHERE format = ? AND id IN (%s)"
+                        % ','.join('?' * len(chunk)),
+                        [fmt, *chunk]
+                    ).fetchall()
+                    for msg_id, payload in rows:
+                        try:
+                            found[msg_id] = _email_from_json(payload)
+                        except (ValueError, TypeError) as e:
+                            logger.debug("Ignoring unreadable cache entry %s: %s", msg_id, e)
+        except sqlite3.Error as e:
+            logger.warning("Message cache lookup failed: %s", e)
+            return {}
+        return found
+    
+    def _cache_store(self, emails: List[Email],
+                     metadata_only: bool = False) -> None:
+        """
+        Save freshly parsed messages to the cache.
+        
+        Args:
+            emails: Email records returned by _parse_message()
+            metadata_only: Whether the emails were fetched metadata-only
+        """
+        db = self._open_cache()
+        if db is None or not emails:
+            return
+        
+        fmt = 'metadata' if metadata_only else 'full'
+        now = int(time.time())
+        try:
+            with self._cache_lock, db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO msgs (id, format, payload, fetched_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(email.id, fmt, json.dumps(asdict(email)), now) for email in emails]
+                )
+        except (sqlite3.Error, ValueError, TypeError) as e:
+            logger.warning("Could not update message cache: %s", e)
+    
+    @staticmethod
+    def _list_params(max_results: int,
+                     query: Optional[str],
+                     label_ids: Optional[List[str]],
+                     include_spam_trash: bool) -> Dict[str, Any]:
+        """
+        Build the messages.list parameters for a fetch.
+        
+        Args:
+            max_results: Maximum number of emails to fetch
+            query: Gmail search query
+            label_ids: List of label IDs to filter by
+            include_spam_trash: Whether to include spam and trash
             
-            # Extract headers
-            headers = message['payload'].get('headers', [])
-            header_dict = {h['name'].lower(): h['value'] for h in headers}
+        Returns:
+            Keyword arguments for messages().list()
+        """
+        params = {**_BASE_LIST_PARAMS, 'maxResults': min(max_results, MAX_LIST_PAGE_SIZE)}
+        if include_spam_trash:
+            params['includeSpamTrash'] = True
+        
+        if query:
+            params['q'] = query
+        
+        if label_ids:
+            params['labelIds'] = label_ids
+        
+        return params
+    
+    def _fetch_chunk(self, msg_ids: List[str],
+                     metadata_only: bool = False,
+                     unfinished: Optional[List[str]] = None) -> List[Email]:
+        """
+        Fetch one chunk of messages on a worker thread.
+        
+        httplib2 connections are not thread-safe, so every worker thread
+        executes its batches over its own authorized Http instance, built
+        like the service's own with build_http() so it has a timeout.
+        
+        Args:
+            msg_ids: Gmail message IDs
+            metadata_only: Fetch headers only and use the snippet as the body
+            unfinished: Passed on to _fetch_batch()
             
-            # Extract body
-            body_text = self._extract_body(message['payload'])
+        Returns:
+            List of Email records
+        """
+        http = None
+        if self.creds is not None:
+            http = getattr(self._local, 'http', None)
+            if http is None:
+                http = google_auth_httplib2.AuthorizedHttp(
+                    self.creds, http=build_http()
+                )
+                self._local.http = http
+        return self._fetch_batch(msg_ids, metadata_only, http=http, unfinished=unfinished)
+    
+    def _fetch_batch(self, msg_ids: List[str],
+                     metadata_only: bool = False,
+                     http: Optional[Any] = None,
+                     unfinished: Optional[List[str]] = None) -> List[Email]:
+        """
+        Fetch and parse several messages with one Gmail batch HTTP request.
+        
+        Sub-requests rejected with a retryable status (429/500/503) are
+        resubmitted together in a smaller batch, waiting for the server's
+        Retry-After or an exponential backoff between attempts.
+        
+        Args:
+            msg_ids: Gmail message IDs
+            metadata_only: Fetch headers only and use the snippet as the body
+            http: Http object to execute the batch with (default: the service's)
+            unfinished: If given, receives the IDs that could not be fetched
+                but may succeed on a later call: those still throttled after
+                MAX_BATCH_RETRIES, and errors outside PERMANENT_STATUSES.
+                Messages that are gone or cannot be parsed are not included.
+            
+        Returns:
+            List of Email records
+        """
+        email_list = []
+        retry_ids = []
+        retry_after = []
+        errors = []
+        
+        # The one place per-message failures are handled: fetch errors and
+        # malformed responses alike are retried or recorded here
+        def on_message(request_id, response, exception):
+            if exception is None:
+                try:
+                    email_list.append(self._parse_message(response, metadata_only))
+                    return
+                except Exception as e:
+                    exception = e
+            status = getattr(getattr(exception, 'resp', None), 'status', None)
+            if status in RETRY_STATUSES:
+                retry_ids.append(request_id)
+                retry_after.append(exception.resp.get('retry-after'))
+            else:
+                errors.append((request_id, exception))
+        
+        messages = self.service.users().messages()
+        pending = msg_ids
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            if attempt:
+                time.sleep(self._backoff_delay(attempt - 1, retry_after))
+                logger.info("Retrying %s failed messages (attempt %s)",
+                            len(pending), attempt)
+            retry_ids.clear()
+            retry_after.clear()
+            
+            batch = BatchHttpRequest(callback=on_message, batch_uri=GMAIL_BATCH_URI)
+            for msg_id in pending:
+                batch.add(
+                    self._get_request(messages, msg_id, metadata_only),
+                    request_id=msg_id
+                )
+            batch.execute(http=http)
+            
+            if not retry_ids:
+                break
+            pending = list(retry_ids)
+        else:
+            logger.warning("Giving up on %s messages after %s retries",
+                           len(pending), MAX_BATCH_RETRIES)
+            if unfinished is not None:
+                unfinished.extend(pending)
+        
+        if errors:
+            _log_fetch_errors(errors, len(msg_ids))
+            if unfinished is not None:
+                unfinished.extend(
+                    msg_id for msg_id, error in errors
+                    if isinstance(error, HttpError)
+                    and error.resp.status not in PERMANENT_STATUSES
+                )
+        return email_list
+    
+    @staticmethod
+    def _backoff_delay(attempt: int, retry_after: List[Optional[str]]) -> float:
+        """
+        Seconds to wait before resubmitting failed sub-requests.
+        
+        Args:
+            attempt: Zero-based retry number
+            retry_after: Retry-After header values from the failed responses
             
-            # Extract date
-            date_str = header_dict.get('date', '')
+        Returns:
+            The largest Retry-After given in seconds, otherwise exponential
+            backoff with jitter; never more than MAX_BACKOFF_SECONDS
+        """
+        hinted = []
+        for value in retry_after:
             try:
-                email_date = parsedate_to_datetime(date_str) if date_str else datetime.now()
-            except:
-                email_date = datetime.now()
-            
-            # Build email dictionary
-            email_dict = {
-                'id': msg_id,
-                'subject': header_dict.get('subject', '(No Subject)'),
-                'body': body_text,
-                'from': header_dict.get('from', ''),
-                'to': header_dict.get('to', ''),
-                'date': email_date.isoformat(),
-                'snippet': message.get('snippet', ''),
-                'thread_id': message.get('threadId', ''),
-                'labels': message.get('labelIds', [])
-            }
-            
-            return email_dict
+                hinted.append(float(value))
+            except (TypeError, ValueError):
+                continue
+        if hinted:
+            # A misbehaving or hostile server must not stall the fetch for hours
+            return min(max(0.0, max(hinted)), MAX_BACKOFF_SECONDS)
+        return min(2 ** attempt, MAX_BACKOFF_SECONDS) + random.random()
+    
+    @staticmethod
+    def _get_request(messages: Any, msg_id: str, metadata_only: bool = False) -> Any:
+        """
+        Build a messages().get() request limited to the fields we parse.
+        
+        Args:
+            messages: The users().messages() resource
+            msg_id: Gmail message ID
+            metadata_only: Request only the headers instead of the MIME tree
             
-        except Exception as e:
-            logger.error(f"Error getting message details for {msg_id}: {e}")
-            return None
+        Returns:
+            An unexecuted HttpRequest
+        """
+        if metadata_only:
+            return messages.get(
+                userId='me', id=msg_id, format='metadata',
+                metadataHeaders=METADATA_HEADERS, fields=METADATA_FIELDS
+            )
+        return messages.get(
+            userId='me', id=msg_id, format='full', fields=MESSAGE_FIELDS
+        )
+    
+    def _parse_message(self, message: Dict[str, Any],
+                       metadata_only: bool = False) -> Email:
+        """
+        Convert a Gmail API message resource into an Email.
+        
+        Args:
+            message: Message resource returned by messages().get()
+            metadata_only: The message has no MIME body; use the snippet instead
+            
+        Returns:
+            Email with the message details
+            
+        Raises:
+            KeyError: If the message resource is missing its payload or headers
+        """
+        # Extract headers
+        headers = message['payload'].get('headers', [])
+        header_dict = {}
+        for header in headers:
+            name = header['name'].lower()
+            if name in _WANTED_HEADERS and name not in header_dict:
+                header_dict[name] = header['value']
+                if len(header_dict) == len(_WANTED_HEADERS):
+                    break
+        
+        # Extract body
+        if metadata_only:
+            body_text = message.get('snippet', '')
+        else:
+            body_text = self._extract_body(message['payload'])
+        
+        return Email(
+            id=message.get('id'),
+            subject=header_dict.get('subject', '(No Subject)'),
+            body=body_text,
+            from_=header_dict.get('from', ''),
+            to=header_dict.get('to', ''),
+            date=header_dict.get('date', ''),
+            snippet=message.get('snippet', ''),
+            thread_id=message.get('threadId', ''),
+            labels=message.get('labelIds', [])
+        )
     
     def _extract_body(self, payload: Dict[str, Any]) -> str:
         """
@@ -219,80 +1052,221 @@ class GmailIntegration:
         Returns:
             Extracted text body
         """
-        body = ""
-        
         try:
-            # Check if body is directly available
-            if 'body' in payload and 'data' in payload['body']:
-                data = payload['body']['data']
-                body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                return body
-            
-            # Check parts (multipart messages)
-            if 'parts' in payload:
-                for part in payload['parts']:
-                    mime_type = part.get('mimeType', '')
-                    
-                    # Prefer text/plain over text/html
+            # Check if body is directly available (single-part messages)
+            data = payload.get('body', {}).get('data')
+            if data:
+                return _decode_body(data)
+            
+            # Walk multipart messages breadth-first, preferring text/plain
+            # over text/html
+            html_data = None
+            pending = deque(payload.get('parts', ()))
+            while pending:
+                part = pending.popleft()
+                mime_type = part.get('mimeType', '')
+                data = part.get('body', {}).get('data')
+                if data:
                     if mime_type == 'text/plain':
-                        if 'body' in part and 'data' in part['body']:
-                            data = part['body']['data']
-                            body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                            return body
-                    
-                    # Fallback to text/html
-                    elif mime_type == 'text/html' and not body:
-                        if 'body' in part and 'data' in part['body']:
-                            data = part['body']['data']
-                            body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                    
-                    # Recursively check nested parts
-                    if 'parts' in part:
-                        nested_body = self._extract_body(part)
-                        if nested_body:
-                            body = nested_body
-                            break
+                        return _decode_body(data)
+                    if mime_type == 'text/html' and html_data is None:
+                        html_data = data
+                pending.extend(part.get('parts', ()))
             
+            body = _decode_body(html_data) if html_data else ""
             return body if body else "(No body content)"
             
         except Exception as e:
-            logger.warning(f"Error extracting body: {e}")
+            logger.warning("Error extracting body: %s", e)
             return "(Error extracting body)"
     
-    def fetch_unread_emails(self, max_results: int = 10) -> List[Dict[str, Any]]:
+    def fetch_unread_emails(self, max_results: int = 10,
+                            batch_size: int = 50) -> List[Email]:
         """
         Convenience method to fetch unread emails.
         
         Args:
             max_results: Maximum number of emails to fetch
+            batch_size: Messages per batch HTTP request
             
         Returns:
-            List of unread email dictionaries
+            List of unread Email records
         """
         return self.fetch_emails(
             max_results=max_results,
             query="is:unread",
-            label_ids=["INBOX"]
+            label_ids=["INBOX"],
+            batch_size=batch_size
         )
     
-    def fetch_recent_emails(self, days: int = 1, max_results: int = 50) -> List[Dict[str, Any]]:
+    def fetch_recent_emails(self, days: int = 1, max_results: int = 50,
+                            batch_size: int = 50,
+                            incremental: bool = False) -> List[Email]:
         """
         Fetch emails from the last N days.
         
+        With incremental=True, the mailbox historyId is remembered in
+        SYNC_STATE_PATH and later calls fetch only the messages added to the
+        inbox since the previous call, via users.history.list, oldest first.
+        Messages beyond max_results are left for the next call rather than
+        dropped. The date query is used on the first call and whenever the
+        stored history has expired.
+        
         Args:
             days: Number of days to look back
             max_results: Maximum number of emails to fetch
+            batch_size: Messages per batch HTTP request
+            incremental: Fetch only messages added since the last call
             
         Returns:
-            List of recent email dictionaries
+            List of recent Email records
+            
+        Raises:
+            ValueError: If batch_size is not positive
         """
-        date_query = datetime.now() - timedelta(days=days)
-        date_str = date_query.strftime("%Y/%m/%d")
-        query = f"after:{date_str}"
+        batch_size = _check_batch_size(batch_size)
+        if incremental and self.service:
+            return self._fetch_incremental(days, max_results, batch_size)
         
         return self.fetch_emails(
             max_results=max_results,
-            query=query,
-            label_ids=["INBOX"]
+            query=_recent_query(days),
+            label_ids=["INBOX"],
+            batch_size=batch_size
         )
+    
+    def _fetch_incremental(self, days: int, max_results: int,
+                           batch_size: int) -> List[Email]:
+        """
+        Fetch inbox messages added since the stored historyId.
+        
+        The sync state keeps the historyId together with the IDs still
+        owed from earlier calls: messages beyond max_results and messages
+        that failed in a way a later call may fix. They are fetched before
+        newer ones. If listing or fetching fails outright, the state is
+        left untouched so the next call covers the same messages.
+        
+        Args:
+            days: Number of days to look back when there is no usable history
+            max_results: Maximum number of emails to fetch
+            batch_size: Messages per batch HTTP request
+            
+        Returns:
+            List of Email records, oldest first
+        """
+        state = self._load_sync_state()
+        state_key = os.path.abspath(self.token_path)
+        entry = state.get(state_key)
+        if not isinstance(entry, dict):
+            entry = {}
+        start_history_id = entry.get('history_id')
+        pending = entry.get('pending', [])
+        
+        unfinished = []
+        email_list = []
+        try:
+            changes = None
+            if start_history_id:
+                changes = self._history_message_ids(start_history_id)
+            
+            if changes is None:
+                # Full sync; take the historyId first so nothing added while
+                # listing is missed next time
+                history_id = self.service.users().getProfile(userId='me').execute()['historyId']
+                params = self._list_params(max_results, _recent_query(days), ["INBOX"], False)
+                # messages.list is newest first, history records oldest first
+                new_ids = list(self._iter_ids(params, max_results))[::-1]
+            else:
+                new_ids, history_id = changes
+                logger.info("Found %s new messages since last sync", len(new_ids))
+            
+            queue = list(dict.fromkeys([*pending, *new_ids]))
+            to_fetch, backlog = queue[:max_results], queue[max_results:]
+            for emails in self._iter_details(to_fetch, batch_size, unfinished=unfinished):
+                email_list.extend(emails)
+        except HttpError as error:
+            logger.error("Gmail API error: %s", error)
+            return []
+        except Exception as e:
+            logger.error("Error fetching emails: %s", e)
+            return []
+        
+        if backlog:
+            logger.info("%s messages left for the next sync", len(backlog))
+        # The historyId only moves on together with everything it still owes
+        state[state_key] = {
+            'history_id': history_id,
+            'pending': list(dict.fromkeys([*unfinished, *backlog]))
+        }
+        self._save_sync_state(state)
+        
+        rank = {msg_id: i for i, msg_id in enumerate(to_fetch)}
+        email_list.sort(key=lambda email: rank.get(email.id, len(rank)))
+        return email_list
+    
+    def _history_message_ids(self, start_history_id: str) -> Optional[Tuple[List[str], str]]:
+        """
+        List the inbox messages added since start_history_id.
+        
+        Args:
+            start_history_id: historyId from the previous sync
+            
+        Returns:
+            Tuple of (message IDs, latest historyId), or None if the history
+            is too old and a full sync is needed
+        """
+        history = self.service.users().history()
+        request = history.list(
+            userId='me', startHistoryId=start_history_id,
+            historyTypes=['messageAdded'], labelId='INBOX'
+        )
+        msg_ids = {}
+        history_id = start_history_id
+        try:
+            while request is not None:
+                response = request.execute()
+                for record in response.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        msg_ids[added['message']['id']] = None
+                history_id = response.get('historyId', history_id)
+                request = history.list_next(request, response)
+        except HttpError as error:
+            if error.resp.status == 404:
+                logger.info("Stored historyId expired, falling back to a full sync")
+                return None
+            raise
+        return list(msg_ids), history_id
+    
+    @staticmethod
+    def _load_sync_state() -> Dict[str, Dict[str, Any]]:
+        """
+        Read the stored sync state.
+        
+        Returns:
+            Dictionary mapping token paths to {'history_id', 'pending'},
+            empty if the file is missing or does not hold a JSON object
+        """
+        try:
+            with open(SYNC_STATE_PATH) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return state if isinstance(state, dict) else {}
+    
+    @staticmethod
+    def _save_sync_state(state: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Write the sync state atomically.
+        
+        Args:
+            state: Dictionary mapping token paths to {'history_id', 'pending'}
+        """
+        try:
+            os.makedirs(os.path.dirname(SYNC_STATE_PATH), mode=0o700, exist_ok=True)
+            tmp_path = SYNC_STATE_PATH + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, SYNC_STATE_PATH)
+        except OSError as e:
+            logger.warning("Could not save sync state: %s", e)
 
@@ -6,9 +6,9 @@ with optional Gmail API integration.
 """
 
 from .EmailAgent_optimized import EmailAgent, Task
-from .GmailIntegration import GmailIntegration
+from .GmailIntegration import Email, GmailIntegration
 from .GmailEmailAgent import GmailEmailAgent
 
-__all__ = ['EmailAgent', 'Task', 'GmailIntegration', 'GmailEmailAgent']
+__all__ = ['EmailAgent', 'Task', 'Email', 'GmailIntegration', 'GmailEmailAgent']
 __version__ = '1.0.0'
 
@@ -0,0 +1,213 @@
+"""
+Shared fixtures: an in-memory stand-in for the Gmail API service.
+
+The fakes implement just the parts of googleapiclient that GmailIntegration
+touches (messages.list/get, history.list, getProfile and batch requests), so
+fetching, retries, caching and incremental sync run without network access.
+"""
+
+import base64
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+import GmailIntegration as gmail_module
+
+
+def http_error(status, **headers):
+    """An HttpError as raised by googleapiclient for the given status."""
+    resp = httplib2.Response({'status': status, **headers})
+    return HttpError(resp, b'{}')
+
+
+def make_message(index, subject='Subject', body='Body'):
+    """A messages.get(format='full') resource."""
+    data = base64.urlsafe_b64encode(body.encode()).decode()
+    return {
+        'id': f'm{index}',
+        'threadId': f't{index}',
+        'labelIds': ['INBOX'],
+        'snippet': body[:20],
+        'payload': {
+            'mimeType': 'text/plain',
+            'headers': [
+                {'name': 'Subject', 'value': subject},
+                {'name': 'From', 'value': 'sender@example.com'},
+                {'name': 'To', 'value': 'me@example.com'},
+                {'name': 'Date', 'value': 'Mon, 13 Oct 2025 10:00:00 +0000'},
+            ],
+            'body': {'data': data},
+        },
+    }
+
+
+class FakeRequest:
+    """An unexecuted HttpRequest."""
+
+    def __init__(self, run, **kwargs):
+        self.run = run
+        self.kwargs = kwargs
+
+    def execute(self, http=None, num_retries=0):
+        return self.run()
+
+
+class FakeBatch:
+    """BatchHttpRequest calling its callback for every sub-request."""
+
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self.requests.append((request, request_id))
+
+    def execute(self, http=None):
+        self.service.batches.append([request_id for _, request_id in self.requests])
+        if self.service.batch_error is not None:
+            raise self.service.batch_error
+        for request, request_id in self.requests:
+            try:
+                response, exception = request.execute(), None
+            except Exception as e:
+                response, exception = None, e
+            self.callback(request_id, response, exception)
+
+
+class FakeHistory:
+    """users().history() backed by FakeService.history_records."""
+
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, userId, startHistoryId, historyTypes=None, labelId=None,
+             pageToken=None):
+        def run():
+            service = self.service
+            if service.history_error is not None:
+                raise service.history_error
+            records = [(history_id, msg_id) for history_id, msg_id in service.history_records
+                       if history_id > int(startHistoryId)]
+            start = int(pageToken or 0)
+            page = records[start:start + 2]
+            response = {
+                'history': [{'id': str(history_id),
+                             'messagesAdded': [{'message': {'id': msg_id}}]}
+                            for history_id, msg_id in page],
+                'historyId': str(service.history_id),
+            }
+            if start + 2 < len(records):
+                response['nextPageToken'] = str(start + 2)
+            return response
+        return FakeRequest(run, userId=userId, startHistoryId=startHistoryId,
+                           historyTypes=historyTypes, labelId=labelId)
+
+    def list_next(self, previous_request, previous_response):
+        token = previous_response.get('nextPageToken')
+        if not token:
+            return None
+        return self.list(pageToken=token, **previous_request.kwargs)
+
+
+class FakeService:
+    """
+    The users() resource of a Gmail service holding self.store.
+
+    messages.list returns IDs newest first (highest index first), like
+    Gmail. Set failures[msg_id] to a list of exceptions that the next
+    messages.get calls for that ID raise, one per call.
+    """
+
+    def __init__(self, count=0, page_size=100):
+        self.store = {}
+        self.history_id = 100
+        self.history_records = []
+        self.page_size = page_size
+        self.failures = {}
+        self.batches = []
+        self.gets = []
+        self.batch_error = None
+        self.history_error = None
+        for index in range(count):
+            self.add_message(index, record=False)
+
+    def add_message(self, index, record=True, **fields):
+        message = make_message(index, **fields)
+        self.store[message['id']] = message
+        if record:
+            self.history_id += 1
+            self.history_records.append((self.history_id, message['id']))
+        return message['id']
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return FakeHistory(self)
+
+    def getProfile(self, userId):
+        return FakeRequest(lambda: {'historyId': str(self.history_id)})
+
+    def list(self, userId, maxResults=100, pageToken=None, **kwargs):
+        def run():
+            order = sorted(self.store, key=lambda msg_id: -int(msg_id[1:]))
+            start = int(pageToken or 0)
+            size = min(maxResults, self.page_size)
+            ids = order[start:start + size]
+            response = {'messages': [{'id': msg_id} for msg_id in ids]} if ids else {}
+            if start + size < len(order):
+                response['nextPageToken'] = str(start + size)
+            return response
+        return FakeRequest(run, userId=userId, maxResults=maxResults, **kwargs)
+
+    def list_next(self, previous_request, previous_response):
+        token = previous_response.get('nextPageToken')
+        if not token:
+            return None
+        return self.list(pageToken=token, **previous_request.kwargs)
+
+    def get(self, userId, id, **kwargs):
+        def run():
+            self.gets.append(id)
+            pending = self.failures.get(id)
+            if pending:
+                raise pending.pop(0)
+            if id not in self.store:
+                raise http_error(404)
+            return self.store[id]
+        return FakeRequest(run, userId=userId, id=id, **kwargs)
+
+    def fetched_ids(self):
+        """IDs sent in batch requests, in order."""
+        return [msg_id for batch in self.batches for msg_id in batch]
+
+
+@pytest.fixture
+def service():
+    return FakeService(count=20)
+
+
+@pytest.fixture
+def gmail(service, tmp_path, monkeypatch):
+    """A GmailIntegration on the fake service, without a message cache."""
+    monkeypatch.setattr(
+        gmail_module, 'BatchHttpRequest',
+        lambda callback=None, batch_uri=None: FakeBatch(service, callback)
+    )
+    monkeypatch.setattr(gmail_module, 'SYNC_STATE_PATH', str(tmp_path / 'state' / 'state.json'))
+    monkeypatch.setattr(gmail_module.GmailIntegration, '_backoff_delay',
+                        staticmethod(lambda attempt, retry_after: 0))
+    gmail = gmail_module.GmailIntegration(token_path=str(tmp_path / 'token.json'),
+                                          cache_path=None)
+    gmail.service = service
+    return gmail
@@ -0,0 +1,169 @@
+"""Tests for batched message fetching in GmailIntegration."""
+
+import pytest
+
+import GmailIntegration as gmail_module
+from conftest import http_error, make_message
+
+
+def test_fetch_emails_parses_messages(gmail, service):
+    emails = gmail.fetch_emails(max_results=3)
+
+    assert [email.id for email in emails] == ['m19', 'm18', 'm17']
+    email = emails[0]
+    assert email.subject == 'Subject'
+    assert email.body == 'Body'
+    assert email.from_ == 'sender@example.com'
+    assert email.labels == ['INBOX']
+    # Every message went out in one batch request
+    assert service.batches == [['m19', 'm18', 'm17']]
+
+
+@pytest.mark.parametrize('batch_size', [0, -1])
+def test_non_positive_batch_size_is_rejected(gmail, batch_size):
+    with pytest.raises(ValueError):
+        gmail.fetch_emails(batch_size=batch_size)
+    with pytest.raises(ValueError):
+        next(gmail.iter_email_batches(batch_size=batch_size))
+    with pytest.raises(ValueError):
+        gmail.fetch_recent_emails(batch_size=batch_size, incremental=True)
+
+
+def test_batch_size_is_clamped_to_gmail_limit(gmail, service):
+    for index in range(20, 250):
+        service.add_message(index, record=False)
+
+    emails = gmail.fetch_emails(max_results=250, batch_size=500)
+
+    assert len(emails) == 250
+    assert [len(batch) for batch in service.batches] == [100, 100, 50]
+
+
+def test_throttled_messages_are_retried(gmail, service):
+    service.failures['m3'] = [http_error(429), http_error(503)]
+
+    emails = gmail._fetch_batch(['m1', 'm2', 'm3'])
+
+    assert sorted(email.id for email in emails) == ['m1', 'm2', 'm3']
+    # Only the throttled message is resubmitted, once per failure
+    assert service.batches == [['m1', 'm2', 'm3'], ['m3'], ['m3']]
+
+
+def test_gives_up_after_max_retries(gmail, service):
+    service.failures['m2'] = [http_error(429)] * (gmail_module.MAX_BATCH_RETRIES + 1)
+
+    emails = gmail._fetch_batch(['m1', 'm2'])
+
+    assert [email.id for email in emails] == ['m1']
+    assert len(service.batches) == gmail_module.MAX_BATCH_RETRIES + 1
+
+
+def test_backoff_waits_between_retries(gmail, service, monkeypatch):
+    delays = []
+    monkeypatch.setattr(gmail_module.GmailIntegration, '_backoff_delay',
+                        staticmethod(lambda attempt, retry_after: attempt + 1))
+    monkeypatch.setattr(gmail_module.time, 'sleep', delays.append)
+    service.failures['m1'] = [http_error(429)] * 3
+
+    gmail._fetch_batch(['m1'])
+
+    assert delays == [1, 2, 3]
+
+
+def test_backoff_delay_honours_and_caps_retry_after():
+    delay = gmail_module.GmailIntegration.__dict__['_backoff_delay'].__func__
+
+    assert delay(0, ['3', None, 'soon']) == 3
+    assert delay(0, ['86400']) == gmail_module.MAX_BACKOFF_SECONDS
+    assert delay(0, ['-5']) == 0
+    assert 1 <= delay(0, [None]) < 2
+    assert gmail_module.MAX_BACKOFF_SECONDS <= delay(10, []) < gmail_module.MAX_BACKOFF_SECONDS + 1
+
+
+def test_requests_only_the_parsed_fields(gmail, service):
+    requests = []
+    get = service.get
+    service.get = lambda **kwargs: requests.append(kwargs) or get(**kwargs)
+
+    gmail.fetch_emails(max_results=1)
+    gmail.fetch_emails(max_results=1, metadata_only=True)
+
+    assert requests[0]['fields'] == gmail_module.MESSAGE_FIELDS
+    assert requests[1]['fields'] == gmail_module.METADATA_FIELDS
+    assert requests[1]['format'] == 'metadata'
+
+
+def test_metadata_only_uses_snippet(gmail, service):
+    service.store['m19'] = dict(make_message(19, body='A longer body text'), payload={
+        'headers': [{'name': 'Subject', 'value': 'Hi'}],
+    })
+
+    emails = gmail.fetch_emails(max_results=1, metadata_only=True)
+
+    assert emails[0].subject == 'Hi'
+    assert emails[0].body == 'A longer body text'
+
+
+def test_fetch_emails_keeps_listing_order(gmail, service):
+    service.failures['m17'] = [http_error(429)]
+    gmail._cache_lookup = lambda msg_ids, metadata_only=False: {
+        msg_id: gmail._parse_message(service.store[msg_id])
+        for msg_id in msg_ids if msg_id in ('m5', 'm12')
+    }
+
+    emails = gmail.fetch_emails(max_results=20, batch_size=4)
+
+    assert [email.id for email in emails] == [f'm{index}' for index in range(19, -1, -1)]
+
+
+def test_unfinished_ids_exclude_permanent_failures(gmail, service):
+    service.failures['m1'] = [http_error(404)]
+    service.failures['m2'] = [http_error(403)]
+    service.failures['m3'] = [http_error(429)] * (gmail_module.MAX_BATCH_RETRIES + 1)
+    service.store['m4'] = {'id': 'm4'}  # no payload: cannot be parsed
+    unfinished = []
+
+    emails = gmail._fetch_batch(['m1', 'm2', 'm3', 'm4', 'm5'], unfinished=unfinished)
+
+    assert [email.id for email in emails] == ['m5']
+    assert sorted(unfinished) == ['m2', 'm3']
+
+
+def test_injected_service_lists_everything_before_fetching(gmail, service):
+    service.page_size = 5
+    calls = []
+    list_page, get = service.list, service.get
+
+    def tracked(kind, make_request):
+        def wrapper(*args, **kwargs):
+            request = make_request(*args, **kwargs)
+            run = request.run
+            request.run = lambda: (calls.append(kind), run())[1]
+            return request
+        return wrapper
+
+    service.list = tracked('list', list_page)
+    service.get = tracked('get', get)
+
+    emails = gmail.fetch_emails(max_results=20, batch_size=5)
+
+    assert len(emails) == 20
+    assert calls.count('list') == 4
+    assert calls.index('get') > max(i for i, kind in enumerate(calls) if kind == 'list')
+
+
+def test_worker_connections_have_a_timeout(gmail, service, monkeypatch):
+    connections = []
+
+    def authorized_http(creds, http):
+        connections.append((creds, http))
+        return http
+
+    monkeypatch.setattr(gmail_module.google_auth_httplib2, 'AuthorizedHttp', authorized_http)
+    gmail.creds = object()
+
+    assert len(gmail.fetch_emails(max_results=10, batch_size=2)) == 10
+    assert connections
+    for creds, http in connections:
+        assert creds is gmail.creds
+        assert http.timeout is not None
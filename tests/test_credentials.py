@@ -0,0 +1,148 @@
+"""Tests for authentication, credential caching and service reuse."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import GmailIntegration as gmail_module
+
+
+def utcnow():
+    """Naive UTC now, the way google-auth stores expiry."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class FakeCredentials:
+    def __init__(self, valid=True, expires_in=timedelta(hours=1), refresh_token='refresh'):
+        self.valid = valid
+        self.expiry = utcnow() + expires_in
+        self.refresh_token = refresh_token
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.valid = True
+        self.expiry = utcnow() + timedelta(hours=1)
+
+    def to_json(self):
+        return '{}'
+
+
+@pytest.fixture
+def auth(tmp_path, monkeypatch):
+    """A GmailIntegration whose OAuth flow and service builder are faked."""
+    credentials_path = tmp_path / 'credentials.json'
+    credentials_path.write_text('{}')
+    builds = []
+    logins = []
+
+    def build(*args, credentials=None, **kwargs):
+        builds.append(credentials)
+        return ('service', credentials)
+
+    class Flow:
+        def run_local_server(self, port):
+            logins.append(FakeCredentials())
+            return logins[-1]
+
+    monkeypatch.setattr(gmail_module, 'build', build)
+    monkeypatch.setattr(gmail_module.InstalledAppFlow, 'from_client_secrets_file',
+                        lambda path, scopes: Flow())
+    monkeypatch.setattr(gmail_module, '_CREDS_CACHE', {})
+    gmail = gmail_module.GmailIntegration(str(credentials_path), str(tmp_path / 'token.json'),
+                                          cache_path=None)
+    gmail.builds = builds
+    gmail.logins = logins
+    return gmail
+
+
+def test_service_is_built_once(auth):
+    assert auth.authenticate()
+    assert auth.authenticate()
+
+    assert len(auth.logins) == 1
+    assert auth.builds == [auth.logins[0]]
+
+
+def test_refreshing_in_place_keeps_the_service(auth):
+    auth.authenticate()
+    service = auth.service
+    auth.creds.expiry = utcnow() + timedelta(minutes=1)
+
+    assert auth.authenticate()
+
+    assert auth.creds.refreshes == 1
+    assert auth.service is service
+
+
+def test_new_login_rebuilds_the_service(auth):
+    auth.authenticate()
+    auth.creds.valid = False
+    auth.creds.refresh_token = None
+    auth.creds.expiry = utcnow() - timedelta(minutes=1)
+
+    assert auth.authenticate()
+
+    assert len(auth.logins) == 2
+    assert auth.service == ('service', auth.logins[1])
+    assert auth.creds is auth.logins[1]
+
+
+@pytest.fixture
+def loads(auth, monkeypatch):
+    """Fake reading token.json; returns the credentials loaded so far."""
+    loaded = []
+
+    def from_authorized_user_file(path, scopes):
+        loaded.append(FakeCredentials())
+        return loaded[-1]
+
+    monkeypatch.setattr(gmail_module.Credentials, 'from_authorized_user_file',
+                        from_authorized_user_file)
+    with open(auth.token_path, 'w') as f:
+        f.write('{"token": "a"}')
+    return loaded
+
+
+def another(auth):
+    return gmail_module.GmailIntegration(auth.credentials_path, auth.token_path,
+                                         cache_path=None)
+
+
+def test_unchanged_token_file_is_loaded_once(auth, loads):
+    first = auth._load_credentials()
+
+    assert another(auth)._load_credentials() is first
+    assert loads == [first]
+
+
+def test_missing_token_file_loads_nothing(auth, loads):
+    gmail_module.os.remove(auth.token_path)
+
+    assert auth._load_credentials() is None
+    assert loads == []
+
+
+def test_cached_credentials_expire_after_the_ttl(auth, loads, monkeypatch):
+    first = auth._load_credentials()
+    monkeypatch.setattr(gmail_module, 'TOKEN_CACHE_TTL', 0)
+
+    assert auth._load_credentials() is not first
+    assert len(loads) == 2
+
+
+def test_rewritten_token_file_is_loaded_again(auth, loads):
+    first = auth._load_credentials()
+    with open(auth.token_path, 'w') as f:
+        f.write('{"token": "longer"}')
+
+    assert auth._load_credentials() is not first
+    assert len(loads) == 2
+
+
+def test_saved_credentials_are_cached(auth, loads):
+    gmail_module.os.remove(auth.token_path)
+    auth.authenticate()
+
+    assert another(auth)._load_credentials() is auth.logins[0]
+    assert loads == []
@@ -0,0 +1,127 @@
+"""Tests for GmailIntegration.fetch_emails_async()."""
+
+import asyncio
+import json
+import types
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import GmailIntegration as gmail_module
+
+
+class FakeResponse:
+    """The part of aiohttp.ClientResponse that _get_message_async reads."""
+
+    def __init__(self, status, body=None):
+        self.status = status
+        self.headers = {}
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(f'HTTP {self.status}')
+
+    async def read(self):
+        return json.dumps(self.body).encode()
+
+
+class FakeSession:
+    """aiohttp.ClientSession serving messages.get from a FakeService."""
+
+    def __init__(self, service, headers):
+        self.service = service
+        self.headers = headers
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def get(self, url, params=None):
+        msg_id = url.rsplit('/', 1)[-1]
+        self.service.gets.append(msg_id)
+        pending = self.service.failures.get(msg_id)
+        if pending:
+            return FakeResponse(pending.pop(0))
+        if msg_id not in self.service.store:
+            return FakeResponse(404)
+        return FakeResponse(200, self.service.store[msg_id])
+
+
+@pytest.fixture
+def sessions(service, monkeypatch):
+    """Replace aiohttp with fakes; returns the sessions opened."""
+    opened = []
+
+    def client_session(connector=None, headers=None):
+        opened.append(FakeSession(service, headers))
+        return opened[-1]
+
+    fake_aiohttp = types.SimpleNamespace(TCPConnector=lambda **kwargs: None,
+                                         ClientSession=client_session)
+    monkeypatch.setattr(gmail_module, 'aiohttp', fake_aiohttp)
+    return opened
+
+
+@pytest.fixture
+def authed_gmail(gmail):
+    """The gmail fixture with credentials that do not need refreshing."""
+    expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+    gmail.creds = types.SimpleNamespace(token='token', expiry=expiry, valid=True)
+    return gmail
+
+
+def fetch(gmail, **kwargs):
+    return [email.id for email in asyncio.run(gmail.fetch_emails_async(**kwargs))]
+
+
+def test_messages_are_fetched_with_the_access_token(authed_gmail, service, sessions):
+    assert fetch(authed_gmail, max_results=3) == ['m19', 'm18', 'm17']
+    assert sessions[0].headers == {'Authorization': 'Bearer token'}
+    assert sorted(service.gets) == ['m17', 'm18', 'm19']
+
+
+def test_cache_hits_keep_listing_order(authed_gmail, service, sessions, tmp_path):
+    authed_gmail.cache_path = str(tmp_path / 'cache' / 'messages.db')
+    authed_gmail._cache_store([authed_gmail._parse_message(service.store['m18'], False)],
+                              False)
+
+    # m18 is now cached; it must stay between m19 and m17
+    assert fetch(authed_gmail, max_results=3) == ['m19', 'm18', 'm17']
+    assert sorted(service.gets) == ['m17', 'm19']
+
+
+def test_throttled_requests_are_retried(authed_gmail, service, sessions):
+    service.failures['m19'] = [429, 503]
+
+    assert fetch(authed_gmail, max_results=2) == ['m19', 'm18']
+    assert service.gets.count('m19') == 3
+
+
+def test_failed_messages_are_skipped(authed_gmail, service, sessions):
+    service.failures['m18'] = [404]  # listed, then deleted
+
+    assert fetch(authed_gmail, max_results=3) == ['m19', 'm17']
+
+
+def test_injected_service_without_credentials_uses_fetch_emails(gmail, service, sessions):
+    assert gmail.creds is None
+
+    assert fetch(gmail, max_results=3) == ['m19', 'm18', 'm17']
+    assert sessions == []
+    assert service.fetched_ids() == ['m19', 'm18', 'm17']
+
+
+def test_without_aiohttp_falls_back_to_fetch_emails(authed_gmail, service, monkeypatch):
+    monkeypatch.setattr(gmail_module, 'aiohttp', None)
+
+    assert fetch(authed_gmail, max_results=3) == ['m19', 'm18', 'm17']
+    assert service.fetched_ids() == ['m19', 'm18', 'm17']
@@ -0,0 +1,64 @@
+"""Tests for classifying fetched Gmail messages into tasks."""
+
+from datetime import datetime
+
+import pytest
+
+import GmailIntegration as gmail_module
+from GmailEmailAgent import GmailEmailAgent
+from test_keyword_matching import random_emails
+
+
+def as_gmail(emails):
+    return [
+        gmail_module.Email(id=f'm{index}', subject=email['subject'], body=email['body'],
+                           from_='', to='', date='', snippet='', thread_id='', labels=[])
+        for index, email in enumerate(emails)
+    ]
+
+
+def test_batch_matches_perceive_reason_act():
+    emails = random_emails(500, seed=2)
+    created_at = datetime(2025, 10, 13)
+
+    agent = GmailEmailAgent()
+    created = agent._process_batch(as_gmail(emails), created_at)
+
+    expected = GmailEmailAgent()
+    for email in expected.perceive(expected._convert_gmail_to_agent_format(as_gmail(emails))):
+        expected.act(expected.reason(email))
+    assert [(task.task_type, task.priority, task.source_email['gmail_id'])
+            for task in created] == [
+        (task.task_type, task.priority, task.source_email['gmail_id'])
+        for task in expected.tasks]
+    assert all(task.created_at == created_at for task in created)
+
+
+def test_batch_streams_through_the_pipeline(monkeypatch):
+    def no_list(self, emails):
+        pytest.fail('perceive() builds the full list of valid emails')
+
+    monkeypatch.setattr(GmailEmailAgent, 'perceive', no_list)
+    agent = GmailEmailAgent()
+
+    tasks = agent._process_batch(as_gmail([
+        {'subject': 'Team meeting', 'body': ''},
+        {'subject': 'Team meeting', 'body': ''},
+        {'subject': 'Report due', 'body': ''},
+    ]))
+
+    assert [task.task_type for task in tasks] == ['meeting', 'deadline']
+
+
+def test_already_seen_gmail_ids_are_skipped_before_conversion(monkeypatch):
+    monkeypatch.setattr(GmailEmailAgent, 'SEEN_IDS_SIZE', 3)
+    agent = GmailEmailAgent()
+    emails = as_gmail([{'subject': f'Email {index}', 'body': ''} for index in range(5)])
+
+    first = agent._convert_gmail_to_agent_format(emails[:2] + emails[:1])
+    again = agent._convert_gmail_to_agent_format(emails)
+
+    assert [email['gmail_id'] for email in first] == ['m0', 'm1']
+    assert [email['gmail_id'] for email in again] == ['m2', 'm3', 'm4']
+    # Only the newest SEEN_IDS_SIZE IDs are remembered
+    assert list(agent._seen_ids) == ['m2', 'm3', 'm4']
@@ -0,0 +1,130 @@
+"""Tests for fetch_recent_emails(incremental=True) and its sync state."""
+
+import json
+import os
+
+import GmailIntegration as gmail_module
+from conftest import http_error
+
+
+def sync_state(gmail):
+    with open(gmail_module.SYNC_STATE_PATH) as f:
+        return next(iter(json.load(f).values()))
+
+
+def fetch(gmail, max_results=50):
+    return [email.id for email in
+            gmail.fetch_recent_emails(max_results=max_results, incremental=True)]
+
+
+def test_first_call_full_syncs_and_saves_history_id(gmail, service):
+    ids = fetch(gmail, max_results=5)
+
+    # The five newest messages, returned oldest first
+    assert ids == ['m15', 'm16', 'm17', 'm18', 'm19']
+    assert sync_state(gmail) == {'history_id': '100', 'pending': []}
+
+
+def test_later_calls_fetch_only_new_messages(gmail, service):
+    fetch(gmail)
+    assert fetch(gmail) == []
+
+    service.add_message(20)
+    service.add_message(21)
+    assert fetch(gmail) == ['m20', 'm21']
+    assert sync_state(gmail) == {'history_id': '102', 'pending': []}
+
+
+def test_backlog_beyond_max_results_is_kept_for_next_call(gmail, service):
+    fetch(gmail)
+    for index in range(20, 27):
+        service.add_message(index)
+
+    assert fetch(gmail, max_results=3) == ['m20', 'm21', 'm22']
+    assert sync_state(gmail) == {
+        'history_id': '107', 'pending': ['m23', 'm24', 'm25', 'm26']
+    }
+    assert fetch(gmail, max_results=3) == ['m23', 'm24', 'm25']
+    assert fetch(gmail, max_results=3) == ['m26']
+    assert sync_state(gmail)['pending'] == []
+
+
+def test_messages_given_up_after_retries_are_fetched_next_call(gmail, service):
+    fetch(gmail)
+    service.add_message(20)
+    service.add_message(21)
+    throttled = [http_error(429) for _ in range(gmail_module.MAX_BATCH_RETRIES + 1)]
+    service.failures['m21'] = throttled
+
+    assert fetch(gmail) == ['m20']
+    assert sync_state(gmail)['pending'] == ['m21']
+
+    assert fetch(gmail) == ['m21']
+    assert sync_state(gmail)['pending'] == []
+
+
+def test_non_retryable_transient_errors_are_kept_pending(gmail, service):
+    fetch(gmail)
+    service.add_message(20)
+    service.failures['m20'] = [http_error(403)]
+
+    assert fetch(gmail) == []
+    assert sync_state(gmail) == {'history_id': '101', 'pending': ['m20']}
+    assert fetch(gmail) == ['m20']
+
+
+def test_permanent_failures_are_not_retried(gmail, service):
+    fetch(gmail)
+    service.add_message(20)
+    service.add_message(21)
+    del service.store['m20']  # deleted before we got to it: 404
+
+    assert fetch(gmail) == ['m21']
+    assert sync_state(gmail) == {'history_id': '102', 'pending': []}
+
+
+def test_failed_history_listing_keeps_state(gmail, service):
+    fetch(gmail)
+    service.add_message(20)
+    service.history_error = http_error(500)
+
+    assert fetch(gmail) == []
+    assert sync_state(gmail) == {'history_id': '100', 'pending': []}
+
+    service.history_error = None
+    assert fetch(gmail) == ['m20']
+
+
+def test_failed_full_sync_does_not_save_history_id(gmail, service):
+    service.batch_error = OSError('connection reset')
+
+    assert fetch(gmail) == []
+    assert not gmail_module.os.path.exists(gmail_module.SYNC_STATE_PATH)
+
+    service.batch_error = None
+    assert len(fetch(gmail)) == 20
+
+
+def test_expired_history_falls_back_to_full_sync(gmail, service):
+    fetch(gmail, max_results=5)
+    service.add_message(20)
+    service.history_error = http_error(404)
+
+    assert fetch(gmail, max_results=3) == ['m18', 'm19', 'm20']
+    assert sync_state(gmail) == {'history_id': '101', 'pending': []}
+
+
+def test_unknown_state_format_triggers_full_sync(gmail, service):
+    gmail._save_sync_state({gmail_module.os.path.abspath(gmail.token_path): '42'})
+
+    assert len(fetch(gmail)) == 20
+    assert sync_state(gmail) == {'history_id': '100', 'pending': []}
+
+
+def test_state_file_without_an_object_triggers_full_sync(gmail, service):
+    os.makedirs(os.path.dirname(gmail_module.SYNC_STATE_PATH))
+    with open(gmail_module.SYNC_STATE_PATH, 'w') as f:
+        json.dump([], f)
+
+    assert len(fetch(gmail)) == 20
+    assert sync_state(gmail) == {'history_id': '100', 'pending': []}
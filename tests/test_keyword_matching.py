@@ -0,0 +1,163 @@
+"""Tests that every keyword matching backend classifies emails identically."""
+
+import random
+import re
+import threading
+
+import pytest
+
+import EmailAgent_optimized as agent_module
+from EmailAgent_optimized import EmailAgent
+
+
+class AutomatonAgent(EmailAgent):
+    _hyperscan_db = None
+
+
+class JitAgent(EmailAgent):
+    _hyperscan_db = None
+    _automaton = None
+    _use_jit = True
+
+
+class TokenAgent(EmailAgent):
+    _hyperscan_db = None
+    _automaton = None
+    _use_jit = False
+
+
+class RegexAgent(TokenAgent):
+    _tokenizable = False
+
+
+BACKENDS = [
+    pytest.param(EmailAgent, id='hyperscan', marks=pytest.mark.skipif(
+        agent_module.hyperscan is None, reason='hyperscan not installed')),
+    pytest.param(AutomatonAgent, id='automaton', marks=pytest.mark.skipif(
+        agent_module.ahocorasick is None, reason='pyahocorasick not installed')),
+    pytest.param(JitAgent, id='jit', marks=pytest.mark.skipif(
+        agent_module.njit is None, reason='numba not installed')),
+    pytest.param(TokenAgent, id='tokens'),
+    pytest.param(RegexAgent, id='regex'),
+]
+
+# Keywords, near misses and punctuation that exercise the \b boundaries
+WORDS = [
+    'meeting', 'Meetings', 'schedule', 'call', 'callback', 'recall', '_call',
+    'call_', 'e-meeting', 'conference', 'appointment', 'urgent', 'URGENT!',
+    'asap', 'immediately', 'critical.', 'important', 'due', 'overdue',
+    'deliver', 'delivery', 'submit', 'ſubmit', 'deadline', 'deadlines',
+    'hello', 'report', 'x', 'İx', 'café', '',
+]
+
+
+def reference(email):
+    """Classify with the keyword regexes directly, as reason() documents."""
+    text = f"{email['subject']} {email['body']}".casefold()
+    priority = 'high' if re.search(EmailAgent.HIGH_PRIORITY_KEYWORDS, text) else 'normal'
+    if re.search(EmailAgent.MEETING_KEYWORDS, text):
+        return 'meeting', priority
+    if re.search(EmailAgent.DEADLINE_KEYWORDS, text):
+        return 'deadline', priority
+    return 'misc', priority
+
+
+def random_emails(count, seed=1):
+    rng = random.Random(seed)
+    return [
+        {'subject': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 3))),
+         'body': rng.choice(['', ' ', ',', '\n']).join(
+             rng.choice(WORDS) for _ in range(rng.randint(0, 6)))}
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize('agent_class', BACKENDS)
+def test_backends_match_reference(agent_class):
+    agent = agent_class()
+    for email in random_emails(3000):
+        result = agent.reason(email)
+        assert (result['type'], result['priority']) == reference(email), email
+
+
+@pytest.mark.parametrize('agent_class', BACKENDS)
+def test_overridden_words_apply_to_every_backend(agent_class):
+    class Custom(agent_class):
+        MEETING_WORDS = ('standup', 'sync-up')
+
+    # Recompiling rebuilds every matcher; switch off the same backends again
+    for name in ('_hyperscan_db', '_automaton', '_use_jit', '_tokenizable'):
+        if name in vars(agent_class) and not vars(agent_class)[name]:
+            setattr(Custom, name, vars(agent_class)[name])
+    if agent_class is JitAgent:
+        Custom._use_jit = True
+
+    agent = Custom()
+    assert agent.reason({'subject': 'Daily standup', 'body': ''})['type'] == 'meeting'
+    assert agent.reason({'subject': 'Quick sync-up?', 'body': ''})['type'] == 'meeting'
+    assert agent.reason({'subject': 'Team meeting', 'body': ''})['type'] == 'misc'
+    assert agent.reason({'subject': 'Report due', 'body': ''})['type'] == 'deadline'
+
+
+def test_keyword_regexes_are_derived_from_words():
+    class Custom(EmailAgent):
+        MEETING_WORDS = ('standup',)
+
+    assert Custom.MEETING_KEYWORDS == r'\b(?:standup)\b'
+    assert Custom.DEADLINE_KEYWORDS == EmailAgent.DEADLINE_KEYWORDS
+
+
+def test_overridden_regexes_use_the_regex_matcher():
+    class Custom(EmailAgent):
+        MEETING_KEYWORDS = r'\bmeet(ing)?s?\b'
+
+    agent = Custom()
+    assert Custom._hyperscan_db is None and Custom._automaton is None
+    assert agent.reason({'subject': 'Can we MEET?', 'body': ''})['type'] == 'meeting'
+    assert agent.reason({'subject': 'Meets today', 'body': ''})['type'] == 'meeting'
+    assert agent.reason({'subject': 'Conference call', 'body': ''})['type'] == 'misc'
+    # The other regexes are still derived from their word lists
+    assert agent.reason({'subject': 'Report due', 'body': 'ASAP'}) == {
+        'type': 'deadline', 'priority': 'high',
+        'content': {'subject': 'Report due', 'body': 'ASAP'},
+    }
+
+    # Overriding the words again in a subclass brings the fast matchers back
+    class Words(Custom):
+        MEETING_WORDS = ('meet',)
+
+    assert Words._regex_overrides == frozenset()
+    assert Words.MEETING_KEYWORDS == r'\b(?:meet)\b'
+    assert Words().reason({'subject': 'meet me', 'body': ''})['type'] == 'meeting'
+
+
+@pytest.mark.skipif(agent_module.hyperscan is None, reason='hyperscan not installed')
+def test_hyperscan_agents_can_run_in_parallel_threads():
+    emails = random_emails(2000, seed=3)
+    expected = [reference(email) for email in emails]
+    results = {}
+
+    def classify(thread_index):
+        agent = EmailAgent()
+        results[thread_index] = [
+            (result['type'], result['priority'])
+            for result in map(agent.reason, emails)
+        ]
+
+    threads = [threading.Thread(target=classify, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {i: expected for i in range(8)}
+
+
+@pytest.mark.parametrize('agent_class', BACKENDS)
+def test_non_string_fields_are_classified_as_text(agent_class):
+    agent = agent_class()
+    emails = agent.perceive([{'subject': 'x', 'body': 5},
+                             {'subject': ['urgent', 'meeting'], 'body': None}])
+
+    assert [(info['type'], info['priority']) for info in map(agent.reason, emails)] == [
+        ('misc', 'normal'), ('meeting', 'high')]
@@ -0,0 +1,120 @@
+"""Tests for the SQLite message cache in GmailIntegration."""
+
+import json
+import os
+import sqlite3
+import stat
+
+import pytest
+
+import GmailIntegration as gmail_module
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'cache' / 'messages.db')
+
+
+@pytest.fixture
+def cached_gmail(gmail, cache_path):
+    gmail.cache_path = cache_path
+    return gmail
+
+
+def rows(cache_path):
+    with sqlite3.connect(cache_path) as db:
+        return dict(db.execute("SELECT id, payload FROM msgs"))
+
+
+def test_second_fetch_is_served_from_cache(cached_gmail, service):
+    first = cached_gmail.fetch_emails(max_results=5)
+    gets = len(service.gets)
+
+    second = cached_gmail.fetch_emails(max_results=5)
+
+    assert second == first
+    assert len(service.gets) == gets
+
+
+def test_misses_are_fetched_and_stored(cached_gmail, service, cache_path):
+    cached_gmail.fetch_emails(max_results=3)
+    service.gets.clear()
+
+    emails = cached_gmail.fetch_emails(max_results=5)
+
+    assert [email.id for email in emails] == ['m19', 'm18', 'm17', 'm16', 'm15']
+    assert sorted(service.gets) == ['m15', 'm16']
+    assert len(rows(cache_path)) == 5
+
+
+def test_metadata_and_full_entries_are_separate(cached_gmail, service):
+    cached_gmail.fetch_emails(max_results=2, metadata_only=True)
+    service.gets.clear()
+
+    cached_gmail.fetch_emails(max_results=2)
+
+    assert sorted(service.gets) == ['m18', 'm19']
+
+
+def test_rows_store_named_fields(cached_gmail, cache_path):
+    cached_gmail.fetch_emails(max_results=1)
+
+    payload = json.loads(rows(cache_path)['m19'])
+    assert payload['id'] == 'm19'
+    assert payload['from_'] == 'sender@example.com'
+
+
+@pytest.mark.parametrize('payload', ['[1, 2]', '{"id": "m19"}', 'not json', '42'])
+def test_corrupt_rows_are_cache_misses(cached_gmail, service, cache_path, payload):
+    cached_gmail.fetch_emails(max_results=3)
+    with sqlite3.connect(cache_path) as db:
+        db.execute("UPDATE msgs SET payload = ? WHERE id = 'm18'", [payload])
+    service.gets.clear()
+
+    emails = cached_gmail.fetch_emails(max_results=3)
+
+    assert [email.id for email in emails] == ['m19', 'm18', 'm17']
+    assert service.gets == ['m18']
+
+
+def test_database_errors_do_not_break_the_fetch(cached_gmail, service):
+    cached_gmail.fetch_emails(max_results=3)
+    cached_gmail._open_cache().execute("DROP TABLE msgs")
+
+    emails = cached_gmail.fetch_emails(max_results=3)
+
+    assert len(emails) == 3
+
+
+def test_caches_from_other_schema_versions_are_discarded(gmail, service, cache_path):
+    os.makedirs(os.path.dirname(cache_path))
+    with sqlite3.connect(cache_path) as db:
+        db.execute("CREATE TABLE msgs (id TEXT NOT NULL, format TEXT NOT NULL, "
+                   "payload TEXT NOT NULL, fetched_at INTEGER NOT NULL, "
+                   "PRIMARY KEY (id, format))")
+        db.execute("INSERT INTO msgs VALUES ('m19', 'full', ?, 0)",
+                   [json.dumps(['m19', 'Stale', '', '', '', '', '', '', []])])
+    gmail.cache_path = cache_path
+
+    emails = gmail.fetch_emails(max_results=1)
+
+    assert emails[0].subject == 'Subject'
+    with sqlite3.connect(cache_path) as db:
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+    assert version == gmail_module.CACHE_SCHEMA_VERSION
+
+
+def test_cache_is_private_to_the_user(cached_gmail, cache_path):
+    cached_gmail.fetch_emails(max_results=1)
+
+    assert stat.S_IMODE(os.stat(os.path.dirname(cache_path)).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(cache_path).st_mode) == 0o600
+
+
+def test_unusable_cache_path_disables_cache(gmail, tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    gmail.cache_path = str(blocker / 'messages.db')
+
+    assert len(gmail.fetch_emails(max_results=2)) == 2
+    assert gmail.cache_path is None
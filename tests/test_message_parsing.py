@@ -0,0 +1,123 @@
+"""Tests for decoding Gmail API responses into Email records."""
+
+import base64
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+import pytest
+
+import GmailIntegration as gmail_module
+from conftest import make_message
+
+
+def b64(text):
+    """Encode text the way Gmail does: base64url without padding."""
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+needs_orjson = pytest.mark.skipif(gmail_module.orjson is None, reason='orjson not installed')
+
+
+@needs_orjson
+def test_orjson_model_parses_responses():
+    model = gmail_module._OrjsonModel()
+
+    assert model.deserialize(b'{"id": "m1", "labelIds": ["INBOX"]}') == {
+        'id': 'm1', 'labelIds': ['INBOX']
+    }
+
+
+@needs_orjson
+def test_orjson_model_unwraps_data_when_asked():
+    model = gmail_module._OrjsonModel(data_wrapper=True)
+
+    assert model.deserialize(b'{"data": {"id": "m1"}}') == {'id': 'm1'}
+
+
+@needs_orjson
+def test_orjson_model_handles_invalid_content_like_json_model():
+    content = b'not json'
+
+    assert (gmail_module._OrjsonModel().deserialize(content)
+            == gmail_module.JsonModel().deserialize(content))
+
+
+@pytest.mark.parametrize('text', ['', 'a', 'ab', 'abc', 'Grüße ~~~ ???>>>'])
+def test_bodies_decode_without_padding(text):
+    assert gmail_module._decode_body(b64(text)) == text
+
+
+def test_invalid_utf8_is_dropped():
+    data = base64.urlsafe_b64encode(b'ok\xff').decode()
+
+    assert gmail_module._decode_body(data) == 'ok'
+
+
+def part(mime_type, text=None, *parts):
+    body = {'data': b64(text)} if text is not None else {}
+    return {'mimeType': mime_type, 'body': body, 'parts': list(parts)}
+
+
+def test_single_part_body_is_used_directly(gmail):
+    assert gmail._extract_body(part('text/plain', 'Hello')) == 'Hello'
+
+
+def test_nested_plain_text_is_preferred_over_html(gmail):
+    payload = part('multipart/mixed', None,
+                   part('text/html', '<p>Hello</p>'),
+                   part('multipart/alternative', None,
+                        part('text/html', '<p>Nested</p>'),
+                        part('text/plain', 'Plain')))
+
+    assert gmail._extract_body(payload) == 'Plain'
+
+
+def test_first_html_part_is_used_without_plain_text(gmail):
+    payload = part('multipart/alternative', None,
+                   part('image/png', 'binary'),
+                   part('text/html', '<p>First</p>'),
+                   part('text/html', '<p>Second</p>'))
+
+    assert gmail._extract_body(payload) == '<p>First</p>'
+
+
+def test_message_without_text_parts_has_placeholder_body(gmail):
+    payload = part('multipart/mixed', None, part('application/pdf', 'pdf'))
+
+    assert gmail._extract_body(payload) == '(No body content)'
+
+
+def test_date_header_is_kept_unparsed(gmail):
+    email = gmail._parse_message(make_message(1))
+
+    assert email.date == 'Mon, 13 Oct 2025 10:00:00 +0000'
+    assert gmail_module.parse_email_date(email) == datetime(2025, 10, 13, 10, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize('date', ['', 'yesterday'])
+def test_missing_or_malformed_dates_fall_back_to_now(gmail, date):
+    email = replace(gmail._parse_message(make_message(1)), date=date)
+
+    parsed = gmail_module.parse_email_date(email)
+
+    assert parsed.tzinfo is not None
+    assert abs(datetime.now(timezone.utc) - parsed) < timedelta(minutes=1)
+
+
+@pytest.mark.parametrize('date', [
+    'Mon, 13 Oct 2025 10:00:00 +0000',
+    'Mon, 13 Oct 2025 12:30:00 +0230',
+    'Sun, 12 Oct 2025 22:00:00 -0800',
+    '13 Oct 2025 10:00:00 GMT',
+    'Mon, 13 Oct 2025 10:00:00 +0000 (UTC)',
+])
+def test_dates_match_parsedate_to_datetime_in_utc(date):
+    parsed = gmail_module._fast_parsedate(date)
+
+    assert parsed == parsedate_to_datetime(date)
+    assert parsed.utcoffset() == timedelta(0)
+
+
+def test_unparseable_dates_give_none():
+    assert gmail_module._fast_parsedate('not a date') is None
@@ -0,0 +1,158 @@
+"""Tests for the task store of EmailAgent: deduplication, indexes and summary."""
+
+from datetime import datetime
+
+import pytest
+
+import EmailAgent_optimized as agent_module
+from EmailAgent_optimized import EmailAgent
+
+
+MEETING = {'subject': 'Team meeting', 'body': 'Urgent'}
+DEADLINE = {'subject': 'Report due', 'body': 'Friday'}
+MISC = {'subject': 'Weekly update', 'body': 'Notes'}
+
+
+def agent_with(*emails):
+    agent = EmailAgent()
+    for email in agent.perceive(list(emails)):
+        agent.act(agent.reason(email))
+    return agent
+
+
+def test_tasks_is_a_copy_that_cannot_desync_the_indexes():
+    agent = agent_with(MEETING, DEADLINE)
+
+    agent.tasks.clear()
+
+    assert len(agent.tasks) == 2
+    assert [task.task_type for task in agent.get_tasks_by_type('meeting')] == ['meeting']
+
+
+def test_clear_tasks_resets_every_index():
+    agent = agent_with(MEETING, DEADLINE)
+
+    agent.clear_tasks()
+
+    assert agent.tasks == []
+    assert agent.get_tasks_by_type('meeting') == []
+    assert agent.get_tasks_by_priority('high') == []
+    assert agent.get_task_summary() == {}
+    # An equal task can be created again
+    agent.act(agent.reason(MEETING))
+    assert [task.task_type for task in agent.get_tasks_by_type('meeting')] == ['meeting']
+    assert agent.get_task_summary() == {'meeting': 1, 'meeting_high': 1}
+
+
+def test_equal_tasks_are_created_once():
+    agent = agent_with(MEETING, {'subject': 'Another meeting', 'body': 'Agenda'})
+
+    assert [task.task_type for task in agent.tasks] == ['meeting']
+    assert agent.get_task_summary()['meeting'] == 1
+
+
+def test_removed_task_can_be_created_again():
+    agent = agent_with(MEETING)
+    task = agent.tasks[0]
+
+    assert agent.remove_task(task)
+    assert not agent.remove_task(task)
+    assert agent.tasks == []
+
+    agent.act(agent.reason(MEETING))
+    assert agent.tasks == [task]
+
+
+def test_tasks_are_filtered_by_type_and_priority():
+    agent = agent_with(MEETING, DEADLINE, MISC)
+
+    assert [task.task_type for task in agent.get_tasks_by_type('deadline')] == ['deadline']
+    assert [task.task_type for task in agent.get_tasks_by_priority('high')] == ['meeting']
+    assert [task.task_type for task in agent.get_tasks_by_priority('normal')] == [
+        'deadline', 'misc'
+    ]
+    assert agent.get_tasks_by_type('unknown') == []
+
+
+def test_summary_counts_types_and_priorities():
+    agent = agent_with(MEETING, DEADLINE, MISC)
+
+    assert agent.get_task_summary() == {
+        'meeting': 1, 'meeting_high': 1,
+        'deadline': 1, 'deadline_normal': 1,
+        'misc': 1, 'misc_normal': 1,
+    }
+    agent.remove_task(agent.get_tasks_by_type('deadline')[0])
+    assert 'deadline' not in agent.get_task_summary()
+    assert 'deadline_normal' not in agent.get_task_summary()
+
+
+def test_task_descriptions_follow_the_type():
+    agent = agent_with(MEETING, DEADLINE, MISC)
+    agent.act({'type': 'newsletter', 'priority': 'normal', 'content': {}})
+
+    assert [task.description for task in agent.tasks] == [
+        'Follow up on meeting request.',
+        'Check upcoming deadline.',
+        'Review misc email.',
+        'Review email.',
+    ]
+
+
+def test_duplicates_are_rejected_before_building_a_task(monkeypatch):
+    agent = agent_with(MEETING)
+    monkeypatch.setattr(agent_module, 'Task',
+                        lambda **kwargs: pytest.fail('built a duplicate Task'))
+
+    assert agent._act_one(agent.reason(MEETING)) is None
+
+
+@pytest.mark.parametrize('use_numpy', [
+    pytest.param(True, marks=pytest.mark.skipif(agent_module.np is None,
+                                                reason='numpy not installed')),
+    False,
+])
+def test_column_filters_stay_aligned_after_removal(use_numpy, monkeypatch):
+    if not use_numpy:
+        monkeypatch.setattr(agent_module, 'np', None)
+    agent = agent_with(MEETING, DEADLINE, MISC)
+    agent.act({'type': 'newsletter', 'priority': 'high', 'content': {}})
+
+    # Equality ignores priority: this removes the stored high-priority task
+    assert agent.remove_task(agent_module.Task('Follow up on meeting request.', 'meeting'))
+
+    assert [task.task_type for task in agent.get_tasks_by_priority('high')] == ['newsletter']
+    assert [task.task_type for task in agent.get_tasks_by_priority('normal')] == [
+        'deadline', 'misc'
+    ]
+    assert agent.get_tasks_by_type('meeting') == []
+    assert [task.priority for task in agent.get_tasks_by_type('newsletter')] == ['high']
+
+
+def test_bulk_added_tasks_update_every_index():
+    agent = EmailAgent()
+    agent._add_tasks([
+        agent_module.Task('Follow up on meeting request.', 'meeting', priority='high'),
+        agent_module.Task('Check upcoming deadline.', 'deadline'),
+        agent_module.Task('Review email.', 'newsletter', priority='low'),
+    ])
+
+    assert [task.task_type for task in agent.get_tasks_by_priority('high')] == ['meeting']
+    assert [task.task_type for task in agent.get_tasks_by_type('newsletter')] == ['newsletter']
+    assert agent.get_task_summary()['newsletter_low'] == 1
+    # The keys are indexed too, so act() deduplicates against them
+    agent.act(agent.reason(DEADLINE))
+    assert len(agent.tasks) == 3
+
+
+def test_pipeline_tasks_share_one_timestamp():
+    agent = EmailAgent()
+    created_at = datetime(2025, 10, 13, 10, 0)
+
+    tasks = list(agent._pipeline([MEETING, DEADLINE, MEETING, MISC], created_at))
+
+    assert [task.task_type for task in tasks] == ['meeting', 'deadline', 'misc']
+    assert {task.created_at for task in tasks} == {created_at}
+    # Without a timestamp, one is taken for the whole batch
+    tasks = list(EmailAgent()._pipeline([MEETING, DEADLINE, MISC]))
+    assert len({task.created_at for task in tasks}) == 1